@@ -6,18 +6,15 @@ from pathlib import Path
 from typing import List
 
 
-def get_google_credentials(scopes: List[str]) -> service_account.Credentials:
+def load_service_account_info() -> dict:
     """
-    Authenticates with Google APIs using service account credentials.
+    Reads the service account key as a dict.
 
-    It first looks for a 'credentials.json' file in the project root.
+    It first looks for '.secrets/google_drive_credentials.json' in the project root.
     If not found, it falls back to the 'GOOGLE_CREDENTIALS' environment variable.
 
-    Args:
-        scopes (List[str]): A list of scopes to request during authentication.
-
     Returns:
-        service_account.Credentials: The authenticated credentials object.
+        dict: The parsed service account key.
 
     Raises:
         ValueError: If credentials are not found in either the file or environment variable.
@@ -26,15 +23,37 @@ def get_google_credentials(scopes: List[str]) -> service_account.Credentials:
     cred_path = project_root / ".secrets" / "google_drive_credentials.json"
 
     if cred_path.exists():
-        return service_account.Credentials.from_service_account_file(cred_path, scopes=scopes)
+        with open(cred_path) as f:
+            return json.load(f)
 
     if cred_info_str := os.environ.get("GOOGLE_CREDENTIALS"):
-        cred_info = json.loads(cred_info_str)
-        return service_account.Credentials.from_service_account_info(cred_info, scopes=scopes)
+        return json.loads(cred_info_str)
 
     raise ValueError("Google credentials not found. Please set GOOGLE_CREDENTIALS or provide a credentials.json file.")
 
 
+def get_google_credentials(scopes: List[str]) -> service_account.Credentials:
+    """
+    Authenticates with Google APIs using service account credentials.
+
+    The key is read by `load_service_account_info`. Long-running code should
+    prefer `helpers.credentials.get_credential_provider`, which builds the
+    credentials once and caches the access token between runs.
+
+    Args:
+        scopes (List[str]): A list of scopes to request during authentication.
+
+    Returns:
+        service_account.Credentials: The authenticated credentials object.
+
+    Raises:
+        ValueError: If credentials are not found in either the file or environment variable.
+    """
+    return service_account.Credentials.from_service_account_info(
+        load_service_account_info(), scopes=scopes
+    )
+
+
 def get_telegram_token() -> str:
     """
     Retrieves the Telegram bot token.
@@ -0,0 +1,176 @@
+import base64
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+
+from helpers.connection import load_service_account_info
+from utils.metrics import get_metrics
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_TOKEN_CACHE_PATH = PROJECT_ROOT / ".cache" / "google_token.bin"
+
+
+def default_token_cache_path() -> Path | None:
+    """GOOGLE_TOKEN_CACHE_PATH, or `.cache/google_token.bin`; "off" disables the cache."""
+    value = os.getenv("GOOGLE_TOKEN_CACHE_PATH")
+    if value and value.lower() == "off":
+        return None
+    return Path(value or DEFAULT_TOKEN_CACHE_PATH)
+
+
+def _utcnow() -> datetime:
+    # google-auth keeps expiry as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TokenCache:
+    """
+    Access token and expiry on disk, encrypted with Fernet.
+
+    The key is derived (HKDF-SHA256) from the service account's private
+    key, so only a process holding the same key can read the token, and
+    rotating the key simply invalidates the cache.
+    """
+
+    def __init__(self, path: str | Path, private_key: str, identity: str):
+        self.path = Path(path)
+        self.identity = identity
+        key = HKDF(
+            algorithm=hashes.SHA256(), length=32, salt=None, info=b"jadwal-gereja token cache"
+        ).derive(private_key.encode())
+        self._fernet = Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self) -> tuple[str, datetime] | None:
+        """Return (token, expiry) if cached for this identity, otherwise None."""
+        try:
+            data = json.loads(self._fernet.decrypt(self.path.read_bytes()))
+        except (OSError, InvalidToken, ValueError):
+            return None
+        if data.get("identity") != self.identity:
+            return None
+        return data["token"], datetime.fromisoformat(data["expiry"])
+
+    def save(self, token: str, expiry: datetime) -> None:
+        payload = json.dumps(
+            {"identity": self.identity, "token": token, "expiry": expiry.isoformat()}
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        tmp_path.write_bytes(self._fernet.encrypt(payload.encode()))
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+
+class GoogleCredentialProvider:
+    """
+    Service account credentials built once per process and shared by the
+    Sheets (gspread) and Drive (pydrive2) clients.
+
+    The access token is kept in an encrypted `TokenCache`, so a cold start
+    within the token's lifetime (1 hour) skips the OAuth token exchange.
+    `refresh()` renews the token ahead of expiry and updates the cache;
+    long-running modes call it before each iteration.
+    """
+
+    def __init__(self, scopes: List[str], cache_path: str | Path | None = None):
+        self.scopes = list(scopes)
+        self.cache_path = Path(cache_path) if cache_path else default_token_cache_path()
+        self._lock = threading.Lock()
+        self._info = None
+        self._credentials = None
+        self._cache = None
+
+    def credentials(self) -> service_account.Credentials:
+        """google-auth credentials, with the cached access token when it is still valid."""
+        with self._lock:
+            if self._credentials is None:
+                self._load()
+            return self._credentials
+
+    def _load(self) -> None:
+        self._info = load_service_account_info()
+        self._credentials = service_account.Credentials.from_service_account_info(
+            self._info, scopes=self.scopes
+        )
+        if not self.cache_path:
+            return
+
+        identity = f"{self._info['client_email']} {' '.join(sorted(self.scopes))}"
+        self._cache = TokenCache(self.cache_path, self._info["private_key"], identity)
+        cached = self._cache.load()
+        if cached and cached[1] > _utcnow():
+            self._credentials.token, self._credentials.expiry = cached
+            get_metrics().count("token_cache", result="hit")
+        else:
+            get_metrics().count("token_cache", result="miss")
+
+    def manages(self, creds) -> bool:
+        return creds is not None and creds is self._credentials
+
+    def refresh(self, margin: timedelta = timedelta(minutes=5), force: bool = False) -> bool:
+        """
+        Fetch a new access token if the current one expires within `margin`
+        (or `force`), and store it in the cache. Returns True if it refreshed.
+        """
+        creds = self.credentials()
+        with self._lock:
+            if (
+                not force
+                and creds.valid
+                and creds.expiry is not None
+                and creds.expiry - _utcnow() > margin
+            ):
+                return False
+
+            with get_metrics().stage("token_refresh"):
+                creds.refresh(Request())
+            if self._cache is not None:
+                try:
+                    self._cache.save(creds.token, creds.expiry)
+                except OSError as e:
+                    print(f"⚠️ Google token not cached: {e}", flush=True)
+        print(f"🔑 Google credentials refreshed (valid until {creds.expiry} UTC)", flush=True)
+        return True
+
+    def drive_credentials(self):
+        """
+        oauth2client credentials for pydrive2 that reuse the current access
+        token, so connecting to Drive does not trigger another token exchange.
+        """
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        creds = self.credentials()
+        drive_creds = ServiceAccountCredentials.from_json_keyfile_dict(self._info, self.scopes)
+        if creds.valid:
+            drive_creds.access_token = creds.token
+            drive_creds.token_expiry = creds.expiry
+        return drive_creds
+
+
+_provider: GoogleCredentialProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_credential_provider(scopes: List[str] | None = None) -> GoogleCredentialProvider:
+    """
+    Process-wide credential provider. The first call creates it and must
+    pass `scopes`; later calls may omit them.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if not scopes:
+                raise ValueError("The first get_credential_provider() call must pass scopes.")
+            _provider = GoogleCredentialProvider(scopes)
+        elif scopes and sorted(scopes) != sorted(_provider.scopes):
+            raise ValueError("get_credential_provider() was already created with other scopes.")
+        return _provider
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+
+# =======================================
+# GOOGLE SHEETS
+# =======================================
+SPREADSHEET_ID = "1xMNjbpQJhh8jTOaNlxPWy9B2nTEMBAURR9Ys3O90jlM"
+WORKSHEET_NAME = "Jadwal Pasdior"
+SPREADSHEET_ID_OUTPUT = "1nqY5jNzJvsy7v37jnb-rlSDUNvsLYiuHq5-ryAW1Kxs"
+WORKSHEET_OUTPUT = "jadwal"
+ORGANIST_WORKSHEET_NAME = "Data Organis"
+
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+]
+
+# =======================================
+# NOTIFICATIONS
+# =======================================
+ADMIN_CHAT_ID = "1731149425"
+TIMEZONE = "Asia/Jakarta"
+# Reminder wording: templates/reminder[.<platform>].<language>.txt
+LANGUAGE = "id"
+SCHEDULE_LINK = "https://linktr.ee/pasdiormabes"
+# A run keeps retrying failed sends whose backoff ends within this many seconds;
+# the rest stay in the outbox for the next run (or the next serve poll)
+OUTBOX_RETRY_WINDOW = 180
+
+# Column order of the "Jadwal <Name>" tabs
+OUTPUT_COLUMNS = [
+    "Hari",
+    "Tanggal",
+    "Jam",
+    "Anamnesis",
+    "Cara Tobat",
+    "Koor",
+    "Organis",
+    "Tahun Liturgi",
+    "Weekday",
+]
+
+# =======================================
+# SERVE MODE
+# =======================================
+# Daily full run (tabs + reminders), Asia/Jakarta, same as the 23:00 UTC cron
+SERVE_DAILY_AT = "06:00"
+# Seconds between change polls (Drive metadata only) in between daily runs
+SERVE_POLL_SECONDS = 300
+
+
+# =======================================
+# PARISHES
+# =======================================
+# Skip source rows that were already in the past on the previous run
+SOURCE_SKIP_PAST_ROWS = os.getenv("SOURCE_SKIP_PAST_ROWS") == "1"
+# ...but still read the whole sheet at least this often (catches edits to old rows)
+SOURCE_FULL_READ_DAYS = 7
+
+
+@dataclass(frozen=True)
+class SourceLayout:
+    """
+    Where the schedule lives in the source worksheet.
+
+    `main_columns` is the 10-column block read as B..K (date, time, anamnesis,
+    cara tobat, koor, organist, ..., koor/organist overrides) and
+    `extra_columns` the 4-column second section read as O..R (date, time,
+    koor, organist), which stops at `extra_last_row`. With `skip_past_rows`
+    the loader starts each block after the rows that were already past on
+    the previous run.
+    """
+
+    first_row: int = 5
+    main_columns: str = "B:K"
+    extra_columns: str = "O:R"
+    extra_last_row: int = 982
+    skip_past_rows: bool = SOURCE_SKIP_PAST_ROWS
+
+
+@dataclass(frozen=True)
+class Role:
+    """
+    A schedule column whose people get their own tabs and reminders.
+
+    Names in `column` are matched (case-insensitively) against the first
+    column of the `roster_worksheet` (name, Telegram chat id, WhatsApp
+    number). Each person gets a "<tab_prefix> <Name>" tab and a reminder
+    rendered from templates/<template>[.<platform>].<language>.txt and
+    <template>_line.*; `hash_line`, if set, overrides the line the schedule
+    hash is built from (see pipeline.render.HASH_LINE).
+    """
+
+    name: str
+    column: str
+    roster_worksheet: str
+    tab_prefix: str = "Jadwal"
+    template: str = "reminder"
+    hash_line: str | None = None
+
+
+ORGANIST_ROLE = Role(name="organist", column="Organis", roster_worksheet=ORGANIST_WORKSHEET_NAME)
+
+
+@dataclass(frozen=True)
+class ParishConfig:
+    """
+    One parish/community: its sheets, source layout, roles and notification
+    settings. Without `roles` only organists are served, from
+    `organist_worksheet_name`.
+    """
+
+    name: str = "default"
+    spreadsheet_id: str = SPREADSHEET_ID
+    worksheet_name: str = WORKSHEET_NAME
+    spreadsheet_id_output: str = SPREADSHEET_ID_OUTPUT
+    organist_worksheet_name: str = ORGANIST_WORKSHEET_NAME
+    admin_chat_id: str = ADMIN_CHAT_ID
+    notify: bool = True
+    platforms: tuple[str, ...] = ("whatsapp", "telegram")
+    language: str = LANGUAGE
+    schedule_link: str = SCHEDULE_LINK
+    layout: SourceLayout = field(default_factory=SourceLayout)
+    roles: tuple[Role, ...] = ()
+
+    def __post_init__(self):
+        if not self.roles:
+            organist = replace(ORGANIST_ROLE, roster_worksheet=self.organist_worksheet_name)
+            object.__setattr__(self, "roles", (organist,))
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == "default"
+
+    @property
+    def sends_whatsapp(self) -> bool:
+        """Whether reminders go out on WhatsApp (and so need the WhatsApp API)."""
+        return self.notify and "whatsapp" in self.platforms
+
+    def scoped_path(self, path: str | Path) -> Path:
+        """Per-parish variant of a local state file (the default parish keeps the plain path)."""
+        path = Path(path)
+        if self.is_default:
+            return path
+        return path.with_name(f"{path.stem}-{self.name}{path.suffix}")
+
+
+DEFAULT_PARISH = ParishConfig()
+
+
+def load_parishes(path: str | Path | None) -> list[ParishConfig]:
+    """
+    Read a parishes JSON file ({"parishes": [{...}, ...]}, see
+    parishes.example.json). Missing keys fall back to the constants above;
+    without a file only the default parish is returned.
+    """
+    if not path:
+        return [DEFAULT_PARISH]
+
+    data = json.loads(Path(path).read_text())
+    known = {f.name for f in fields(ParishConfig)}
+    parishes = []
+    for entry in data["parishes"]:
+        unknown = set(entry) - known
+        if unknown:
+            raise ValueError(f"Unknown parish config keys: {', '.join(sorted(unknown))}")
+        entry = dict(entry)
+        if "layout" in entry:
+            entry["layout"] = SourceLayout(**entry["layout"])
+        if "platforms" in entry:
+            entry["platforms"] = tuple(entry["platforms"])
+        if "roles" in entry:
+            entry["roles"] = tuple(Role(**role) for role in entry["roles"])
+        parishes.append(ParishConfig(**entry))
+
+    names = [parish.name for parish in parishes]
+    for name in names:
+        if not re.fullmatch(r"[\w-]+", name):
+            raise ValueError(f"Parish name must be a simple identifier: {name!r}")
+    if len(set(names)) != len(names):
+        raise ValueError("Parish names must be unique.")
+    for parish in parishes:
+        role_names = [role.name for role in parish.roles]
+        if len(set(role_names)) != len(role_names):
+            raise ValueError(f"Role names must be unique in parish {parish.name!r}.")
+        # Tabs are titled "<tab_prefix> <Name>"; a shared prefix lets roles overwrite each other
+        prefixes = [role.tab_prefix for role in parish.roles]
+        if len(set(prefixes)) != len(prefixes):
+            raise ValueError(f"Role tab_prefix values must be unique in parish {parish.name!r}.")
+    return parishes
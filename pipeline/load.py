@@ -0,0 +1,298 @@
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import gspread
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import (
+    DateTimeOption,
+    ValueRenderOption,
+    a1_to_rowcol,
+    absolute_range_name,
+    rowcol_to_a1,
+)
+
+from helpers.credentials import get_credential_provider
+from pipeline.config import (
+    DEFAULT_PARISH,
+    SCOPES,
+    SOURCE_FULL_READ_DAYS,
+    TIMEZONE,
+    ParishConfig,
+    SourceLayout,
+)
+from pipeline.preprocess import parse_schedule_dates
+from utils.metrics import get_metrics, track_requests_session
+from utils.number import is_valid_telegram_chat_id, normalize_whatsapp_numbers
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_WATERMARK_PATH = PROJECT_ROOT / ".cache" / "source_watermark.json"
+
+
+def connect_sheets() -> gspread.Client:
+    """
+    Authorize a gspread client with the project's service account.
+
+    Credentials come from the shared provider: a token cached by an earlier
+    run is reused, so the token endpoint is only hit when it is about to expire.
+    """
+    with get_metrics().stage("credentials"):
+        provider = get_credential_provider(SCOPES)
+        provider.refresh()
+        client = gspread.authorize(provider.credentials())
+    track_requests_session(client.http_client.session, api="google")
+    return client
+
+
+def load_rosters(
+    client: gspread.Client, parish: ParishConfig = DEFAULT_PARISH
+) -> dict[str, list[dict]]:
+    """
+    Read the roster sheet of every role ("Data Organis", ...) as
+    {role name: [{"name", "chat_id", "wa_number"}]}, all in one batch read.
+    """
+    with get_metrics().stage("load_rosters", parish=parish.name):
+        return _load_rosters(client, parish)
+
+
+def _load_rosters(client: gspread.Client, parish: ParishConfig) -> dict[str, list[dict]]:
+    spreadsheet = client.open_by_key(parish.spreadsheet_id_output)
+    titles = {ws.title for ws in spreadsheet.worksheets()}
+    for role in parish.roles:
+        if role.roster_worksheet not in titles:
+            raise WorksheetNotFound(role.roster_worksheet)
+
+    response = spreadsheet.values_batch_get(
+        [absolute_range_name(role.roster_worksheet) for role in parish.roles]
+    )
+    rosters = {}
+    for role, value_range in zip(parish.roles, response.get("valueRanges", [])):
+        rosters[role.name] = parse_roster(value_range.get("values", []), role.roster_worksheet)
+    return rosters
+
+
+def parse_roster(values: list[list[str]], sheet_name: str) -> list[dict]:
+    """Roster rows (after the header) as [{"name", "chat_id", "wa_number"}], validated."""
+    records = []
+    for row in values[1:]:
+        if not row or not str(row[0]).strip():
+            continue
+        name = str(row[0]).strip()
+        chat_id = str(row[1]).strip() if len(row) > 1 and str(row[1]).strip() else None
+        wa_number = str(row[2]).strip() if len(row) > 2 and str(row[2]).strip() else None
+        records.append({"name": name, "chat_id": chat_id, "wa_number": wa_number})
+    return validate_contacts(records, sheet_name)
+
+
+def validate_contacts(records: list[dict], sheet_name: str) -> list[dict]:
+    """
+    Check every roster contact once, up front: invalid WhatsApp numbers and
+    Telegram chat ids are reported and dropped, so sending never fails on them.
+    """
+    wa_numbers, invalid = normalize_whatsapp_numbers(
+        [rec["wa_number"] for rec in records]
+    )
+    for rec, normalized in zip(records, wa_numbers):
+        if rec["wa_number"] and normalized is None:
+            print(
+                f"⚠️ Invalid WhatsApp number for {rec['name']} in '{sheet_name}': "
+                f"{invalid[rec['wa_number']]}",
+                flush=True,
+            )
+            rec["wa_number"] = None
+        if rec["chat_id"] and not is_valid_telegram_chat_id(rec["chat_id"]):
+            print(
+                f"⚠️ Invalid Telegram chat id for {rec['name']} in '{sheet_name}': {rec['chat_id']}",
+                flush=True,
+            )
+            rec["chat_id"] = None
+    return records
+
+
+def _column_width(columns: str) -> int:
+    first, last = columns.split(":")
+    return a1_to_rowcol(f"{last}1")[1] - a1_to_rowcol(f"{first}1")[1] + 1
+
+
+def source_ranges(layout: SourceLayout, main_from: int, extra_from: int) -> list[str]:
+    """A1 ranges of the main (B5:K) and extra (O5:R982) blocks, starting at the given rows."""
+    for columns, width in ((layout.main_columns, 10), (layout.extra_columns, 4)):
+        if _column_width(columns) != width:
+            raise ValueError(f"Column range {columns} must span {width} columns")
+    main_first, main_last = layout.main_columns.split(":")
+    extra_first, extra_last = layout.extra_columns.split(":")
+    return [
+        f"{main_first}{main_from}:{main_last}",
+        f"{extra_first}{extra_from}:{extra_last}{layout.extra_last_row}",
+    ]
+
+
+def display_ranges(layout: SourceLayout, main_from: int, extra_from: int) -> list[str]:
+    """A1 ranges of the date and time columns (B5:C, O5:P982), read as the sheet shows them."""
+    ranges = []
+    for columns, start, end in (
+        (layout.main_columns, main_from, ""),
+        (layout.extra_columns, extra_from, layout.extra_last_row),
+    ):
+        first = columns.split(":")[0]
+        second = rowcol_to_a1(1, a1_to_rowcol(f"{first}1")[1] + 1).rstrip("0123456789")
+        ranges.append(f"{first}{start}:{second}{end}")
+    return ranges
+
+
+def past_row_count(rows: list[list], today: date) -> int:
+    """Number of leading rows whose date (first cell) is blank or before `today`."""
+    if not rows:
+        return 0
+    first_cells = pd.Series([row[0] if row else "" for row in rows], dtype=object)
+    dates = parse_schedule_dates(first_cells)
+    # Unparseable but non-blank dates stop the watermark too, to be safe
+    keep = (dates >= pd.Timestamp(today)) | (dates.isna() & (first_cells != ""))
+    return int(keep.values.argmax()) if keep.any() else len(rows)
+
+
+def row_checksum(row: list) -> str:
+    """Short digest of one source row's values ("" cells trimmed, like the API)."""
+    values = list(row)
+    while values and values[-1] == "":
+        values.pop()
+    return hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()[:16]
+
+
+def _row_date(row: list) -> str | None:
+    """ISO date in a row's first cell, or None."""
+    value = parse_schedule_dates(pd.Series([row[0] if row else ""], dtype=object))[0]
+    return None if pd.isnull(value) else value.date().isoformat()
+
+
+def block_watermark(rows: list[list], start: int, today: date, last_row: int | None = None) -> dict:
+    """
+    Watermark of one block read from row `start`: the first row still worth
+    downloading, its date and checksum, and the row after the block's last
+    non-blank row.
+    """
+    past = past_row_count(rows, today)
+    first = rows[past] if past < len(rows) else []
+    return {
+        "row": min(start + past, last_row) if last_row else start + past,
+        "date": _row_date(first),
+        "checksum": row_checksum(first),
+        "end": start + len(rows),
+    }
+
+
+class SourceWatermark:
+    """
+    First source row still worth downloading, per block, kept between runs.
+
+    Rows above it were blank or already past last time, so they can only be
+    upcoming again if someone edits old rows; a full read every
+    SOURCE_FULL_READ_DAYS days picks such edits up. Each block also keeps
+    the date and checksum of the row at the watermark and where the block
+    ended: if a partial read no longer starts with that row, or the block
+    got shorter, rows above were deleted or moved and `matches()` is False.
+    """
+
+    def __init__(self, key: str, path: str | Path | None = None):
+        self.key = key
+        self.path = Path(path or DEFAULT_WATERMARK_PATH)
+
+    def load(self, today: date) -> dict | None:
+        try:
+            state = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # Watermarks saved without row checks cannot be verified
+        if state.get("key") != self.key or "blocks" not in state:
+            return None
+        if today - date.fromisoformat(state["full_read"]) >= timedelta(days=SOURCE_FULL_READ_DAYS):
+            return None
+        return state
+
+    @staticmethod
+    def matches(state: dict, blocks: list[list[list]]) -> bool:
+        """Whether rows read from the saved watermarks still line up with them."""
+        for saved, rows in zip(state["blocks"], blocks):
+            first = rows[0] if rows else []
+            if (
+                saved["row"] + len(rows) < saved["end"]
+                or row_checksum(first) != saved["checksum"]
+                or _row_date(first) != saved["date"]
+            ):
+                return False
+        return True
+
+    def save(self, blocks: list[dict], full_read: date) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        state = {"key": self.key, "blocks": blocks, "full_read": full_read.isoformat()}
+        self.path.write_text(json.dumps(state, indent=2))
+
+
+def load_source_values(
+    client: gspread.Client, parish: ParishConfig = DEFAULT_PARISH
+) -> tuple[list[list], list[list], list[list], list[list]]:
+    """
+    Read the B..K and O..R blocks of the "Jadwal Pasdior" source worksheet in
+    one batch_get, unformatted (dates and times as serial numbers), and their
+    date and time columns in a second one as the sheet shows them, so tabs
+    and reminders keep the sheet's own formatting.
+
+    With `layout.skip_past_rows` each block starts at the row watermark of
+    the previous run. Returns (main_rows, extra_rows, main_shown,
+    extra_shown), the arguments of `build_schedule`.
+    """
+    with get_metrics().stage("load_source", parish=parish.name):
+        source = _load_source_values(client, parish)
+    get_metrics().count("source_rows", len(source[0]) + len(source[1]), parish=parish.name)
+    return source
+
+
+def _load_source_values(
+    client: gspread.Client, parish: ParishConfig
+) -> tuple[list[list], list[list], list[list], list[list]]:
+    layout = parish.layout
+    sheet = client.open_by_key(parish.spreadsheet_id).worksheet(parish.worksheet_name)
+    today = datetime.now(ZoneInfo(TIMEZONE)).date()
+
+    main_from = extra_from = layout.first_row
+    watermark = state = None
+    if layout.skip_past_rows:
+        watermark = SourceWatermark(
+            key=f"{parish.spreadsheet_id}/{parish.worksheet_name}/{layout}",
+            path=parish.scoped_path(DEFAULT_WATERMARK_PATH),
+        )
+        state = watermark.load(today)
+        if state:
+            main_from, extra_from = (block["row"] for block in state["blocks"])
+
+    def read(main_from: int, extra_from: int) -> list[list[list]]:
+        return sheet.batch_get(
+            source_ranges(layout, main_from, extra_from),
+            value_render_option=ValueRenderOption.unformatted,
+            date_time_render_option=DateTimeOption.serial_number,
+        )
+
+    main_rows, extra_rows = read(main_from, extra_from)
+    if state and not watermark.matches(state, [main_rows, extra_rows]):
+        # Rows above the watermark were deleted or moved: upcoming rows may sit above it now
+        print(f"↩️ [{parish.name}] Source rows moved since the last run, reading them all", flush=True)
+        state = None
+        main_from = extra_from = layout.first_row
+        main_rows, extra_rows = read(main_from, extra_from)
+    main_shown, extra_shown = sheet.batch_get(
+        display_ranges(layout, main_from, extra_from),
+        value_render_option=ValueRenderOption.formatted,
+    )
+
+    if watermark is not None:
+        watermark.save(
+            [
+                block_watermark(main_rows, main_from, today),
+                block_watermark(extra_rows, extra_from, today, layout.extra_last_row),
+            ],
+            full_read=date.fromisoformat(state["full_read"]) if state else today,
+        )
+    return main_rows, extra_rows, main_shown, extra_shown
@@ -0,0 +1,304 @@
+import asyncio
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from pipeline.config import DEFAULT_PARISH, OUTBOX_RETRY_WINDOW, ParishConfig
+from pipeline.render import ReminderRenderer
+from utils.dispatcher import NotificationDispatcher, NotificationJob
+from utils.metrics import get_metrics
+from utils.notification_log import NotificationLog
+from utils.notification_store import NotificationStore, default_db_path
+from utils.outbox import DEAD, PENDING, NotificationOutbox
+from utils.rate_limit import TokenBucket
+from utils.telegram_bot import get_telegram_sender
+from utils.whatsapp_bot import AsyncWhatsAppBot
+
+
+def build_senders(whatsAppBot: AsyncWhatsAppBot | None) -> dict:
+    """Return the per-platform send coroutines used by the dispatcher (no WhatsApp without a bot)."""
+
+    async def send_whatsapp(job: NotificationJob) -> None:
+        await whatsAppBot.send(job.recipient, job.text)
+
+    async def send_telegram(job: NotificationJob) -> None:
+        result = await get_telegram_sender().send(job.recipient, job.text)
+        if not result.ok:
+            raise RuntimeError(result.error)
+
+    senders = {"telegram": send_telegram}
+    if whatsAppBot is not None:
+        senders["whatsapp"] = send_whatsapp
+    return senders
+
+
+def record_in_log(notification_log: NotificationLog, entries: list[dict]) -> None:
+    """Write store entries to the "Notification Chat Log" sheet in one flush."""
+    for entry in entries:
+        notification_log.record(
+            entry["name"],
+            id=entry["contact"],
+            preview=entry["preview"],
+            hash_value=entry["schedule_hash"],
+            status=entry["status"],
+            platform=entry["platform"],
+            timestamp=entry["timestamp"],
+        )
+    notification_log.flush()
+
+
+async def mirror_to_sheet(notification_log: NotificationLog, store: NotificationStore) -> None:
+    """Push the latest unmirrored attempt per contact to the sheet (SQLite stays on this thread)."""
+    entries = store.unmirrored()
+    if not entries:
+        return
+    await asyncio.to_thread(record_in_log, notification_log, entries)
+    store.mark_mirrored(max(entry["id"] for entry in entries))
+
+
+async def _load_log(spreadsheet) -> NotificationLog:
+    return await asyncio.to_thread(NotificationLog(spreadsheet).load)
+
+
+async def deliver_outbox(
+    store: NotificationStore,
+    outbox: NotificationOutbox,
+    whatsAppBot: AsyncWhatsAppBot | None = None,
+    buckets: dict[str, TokenBucket] | None = None,
+    retry_window: float = OUTBOX_RETRY_WINDOW,
+    whatsapp: bool = True,
+) -> None:
+    """
+    Send every due outbox job within per-platform rate limits and settle it.
+
+    Failed jobs go back to the outbox with a backoff; while a retry falls
+    due within `retry_window` seconds this keeps draining, later ones are
+    left for the next run. Every attempt is recorded in the history. With
+    `whatsapp=False` no WhatsApp client is opened (Telegram-only parishes).
+    """
+    if outbox.next_due_at() is None:
+        return
+
+    deadline = time.time() + retry_window
+    if whatsAppBot or not whatsapp:
+        bot_context = nullcontext(whatsAppBot)
+    else:
+        bot_context = AsyncWhatsAppBot()
+    async with bot_context as bot:
+        dispatcher = NotificationDispatcher(build_senders(bot), buckets)
+        while True:
+            jobs = outbox.claim_due()
+            if not jobs:
+                due_at = outbox.next_due_at()
+                if due_at is None or due_at > deadline:
+                    break
+                await asyncio.sleep(max(0.0, due_at - time.time()))
+                continue
+
+            for result in await dispatcher.dispatch(jobs):
+                job = result.job
+                if result.ok:
+                    outbox.complete(job)
+                    print(
+                        f"📨 {job.platform.capitalize()} reminder sent to {job.name} ({job.recipient})",
+                        flush=True,
+                    )
+                    status = "sent"
+                else:
+                    state = outbox.fail(job, result.error)
+                    retry_note = "dead-lettered" if state == DEAD else "will retry"
+                    print(
+                        f"⚠️ Failed to send {job.platform.capitalize()} to {job.name} "
+                        f"({retry_note}): {result.error}",
+                        flush=True,
+                    )
+                    status = f"error: {result.error}"
+
+                store.record(
+                    job.name,
+                    id=job.recipient,
+                    preview=job.text[:100],
+                    hash_value=job.hash_value,
+                    status=status,
+                    platform=job.platform,
+                )
+
+    counts = outbox.counts()
+    get_metrics().set("outbox_pending", counts.get(PENDING, 0))
+    get_metrics().set("outbox_dead", counts.get(DEAD, 0))
+    if counts.get(PENDING):
+        print(f"📬 {counts[PENDING]} reminder(s) left in the outbox for the next run", flush=True)
+
+
+def render_reminders(
+    rosters: dict[str, list[dict]],
+    partitions: dict[str, dict[str, pd.DataFrame]],
+    parish: ParishConfig,
+):
+    """Yield (role, roster record, Reminder or None) for every role of the parish."""
+    for role in parish.roles:
+        renderer = ReminderRenderer(
+            parish.language, parish.schedule_link, template=role.template, hash_line=role.hash_line
+        )
+        records = rosters.get(role.name, [])
+        reminders = renderer.render_all(records, partitions[role.name], parish.platforms)
+        for rec in records:
+            yield role, rec, reminders.get(rec["name"].lower())
+
+
+async def send_notifications_reminders(
+    spreadsheet,
+    rosters: dict[str, list[dict]],
+    partitions: dict[str, dict[str, pd.DataFrame]],
+    dry_run: bool = False,
+    whatsAppBot: AsyncWhatsAppBot | None = None,
+    parish: ParishConfig = DEFAULT_PARISH,
+    buckets: dict[str, TokenBucket] | None = None,
+) -> None:
+    """
+    Send everyone in each role's roster (organists, choirs, ...) their next
+    three dates, skipping schedules already sent.
+
+    Each reminder is queued in the outbox under (contact, platform, schedule
+    hash) and then delivered with `deliver_outbox`, together with retries
+    left over from earlier runs. Only a successful send counts as
+    delivered, so a failed reminder is retried even if the schedule is
+    unchanged. Reminders of every role go through the same outbox and
+    dispatcher; a contact listed in two rosters is deduplicated per name.
+
+    Pass an open `whatsAppBot` to reuse its connection pool (serve mode) and
+    shared `buckets` to pace several parishes as one sender; otherwise both
+    are created for this call. Only the parish's enabled platforms are used.
+    """
+    print("🚀 Starting reminder process...\n", flush=True)
+
+    db_path = parish.scoped_path(default_db_path())
+    # A dry run leaves the local delivery state alone: no outbox (nor its recovery),
+    # and history seeded from the sheet only into an in-memory copy
+    store = NotificationStore(db_path, read_only=dry_run)
+    outbox = None if dry_run else NotificationOutbox(db_path)
+    # The sheet is only needed for the mirror step, so read it in the background
+    log_task = asyncio.create_task(_load_log(spreadsheet))
+
+    try:
+        if store.is_empty():
+            # Fresh cache volume: seed the history from the sheet so nothing is resent
+            imported = store.import_log(await log_task)
+            print(f"📥 Seeded notification history from the sheet: {imported} rows", flush=True)
+
+        jobs = []
+        for role, rec, reminder in render_reminders(rosters, partitions, parish):
+            name, chat_id, wa_number = rec["name"], rec["chat_id"], rec["wa_number"]
+            print(f"🔹 Processing {name} ({role.name})...", flush=True)
+
+            # Send notifications if schedule exists
+            if reminder is not None:
+                hash_value = reminder.hash_value
+                for text in dict.fromkeys(reminder.texts.values()):
+                    print(text, flush=True)
+                    print("=" * 60, flush=True)
+
+                # Queue one job per platform unless the schedule was already delivered
+                for platform, recipient in (("whatsapp", wa_number), ("telegram", chat_id)):
+                    if not recipient or platform not in parish.platforms:
+                        continue
+                    reminder_text = reminder.texts[platform]
+
+                    previous = store.latest_delivered(recipient, platform=platform, name=name)
+                    if previous and previous["schedule_hash"] == hash_value:
+                        # Same schedule → skip sending
+                        print(f"⏭ SKIPPED (duplicate schedule): {name}", flush=True)
+                        if not dry_run:
+                            # A retry of a schedule in between (A → B → A) is outdated now
+                            outbox.supersede(recipient, platform, name, hash_value)
+                            store.record(
+                                name,
+                                id=recipient,
+                                preview=reminder_text[:100],
+                                hash_value=hash_value,
+                                status="skipped",
+                                platform=platform,
+                            )
+                    else:
+                        jobs.append(
+                            NotificationJob(
+                                platform=platform,
+                                recipient=recipient,
+                                text=reminder_text,
+                                name=name,
+                                hash_value=hash_value,
+                            )
+                        )
+
+        if dry_run:
+            for job in jobs:
+                print(
+                    f"🧪 [dry-run] Would send {job.platform} to {job.name} ({job.recipient})",
+                    flush=True,
+                )
+            return
+
+        for job in jobs:
+            state = outbox.enqueue(job)
+            if state == DEAD:
+                print(
+                    f"☠️ Not sending {job.platform} to {job.name}: this schedule was dead-lettered",
+                    flush=True,
+                )
+
+        # Send everything within per-platform rate limits; pacing only applies to real sends
+        await deliver_outbox(
+            store, outbox, whatsAppBot, buckets, whatsapp=parish.sends_whatsapp
+        )
+    finally:
+        if outbox is not None:
+            outbox.close()
+        # Mirror the summarized history to the sheet; on failure it is retried next run
+        try:
+            notification_log = await log_task
+            if not dry_run:
+                await mirror_to_sheet(notification_log, store)
+        except Exception as e:
+            print(f"⚠️ Notification log not mirrored to the sheet (will retry next run): {e}", flush=True)
+        finally:
+            store.close()
+
+    print("\n✅ All reminders processed!", flush=True)
+
+
+def has_pending_reminders(parish: ParishConfig = DEFAULT_PARISH) -> bool:
+    """True if the parish's outbox still holds reminders waiting to be sent."""
+    with NotificationOutbox(parish.scoped_path(default_db_path())) as outbox:
+        return outbox.next_due_at() is not None
+
+
+async def retry_outbox(
+    spreadsheet,
+    whatsAppBot: AsyncWhatsAppBot | None = None,
+    parish: ParishConfig = DEFAULT_PARISH,
+    buckets: dict[str, TokenBucket] | None = None,
+    retry_window: float = 0,
+) -> None:
+    """
+    Deliver outbox jobs that fell due since the last run. Serve mode calls
+    this on every poll without waiting (`retry_window=0`); a run whose
+    sheets did not change drains the outbox like a full run would.
+    """
+    db_path = parish.scoped_path(default_db_path())
+    with NotificationOutbox(db_path) as outbox:
+        due_at = outbox.next_due_at()
+        if due_at is None or due_at > time.time() + retry_window:
+            return
+        with NotificationStore(db_path) as store:
+            print(f"📬 [{parish.name}] Retrying due reminders from the outbox", flush=True)
+            await deliver_outbox(
+                store,
+                outbox,
+                whatsAppBot,
+                buckets,
+                retry_window=retry_window,
+                whatsapp=parish.sends_whatsapp,
+            )
+            notification_log = await _load_log(spreadsheet)
+            await mirror_to_sheet(notification_log, store)
@@ -0,0 +1,252 @@
+import calendar
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from pipeline.config import OUTPUT_COLUMNS, TIMEZONE
+
+
+def get_first_advent(year: int) -> datetime:
+    """Return the date of the first Advent Sunday for the given year."""
+    dec_25 = datetime(year, 12, 25)
+    days_to_sunday = dec_25.weekday() + 1
+    return dec_25 - timedelta(days=days_to_sunday + 21)
+
+
+# Month tokens keyed by their first three letters (English and Indonesian)
+MONTH_TOKENS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "mei": 5,
+    "jun": 6, "jul": 7, "aug": 8, "agu": 8, "agt": 8, "sep": 9,
+    "oct": 10, "okt": 10, "nov": 11, "dec": 12, "des": 12,
+}
+
+# Indonesian day names indexed by `dt.dayofweek` (Monday = 0)
+INDONESIAN_DAY_NAMES = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+
+# Liturgical year letter indexed by `year % 3`
+LITURGICAL_YEAR_LETTERS = ["C", "A", "B"]
+
+# Day-first dates such as "5 Jan 2025", "05-Sept-25" or "5/1/2025"
+DATE_PATTERN = r"^(\d{1,2})[\s\-/.]+([A-Za-z]+|\d{1,2})[\s\-/.,]+(\d{2}|\d{4})$"
+
+
+def _numeric_cells(values: pd.Series) -> pd.Series:
+    """Cells that Sheets returned as numbers (UNFORMATTED_VALUE), NaN elsewhere."""
+    is_number = values.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    return pd.to_numeric(values.where(is_number), errors="coerce")
+
+
+def parse_schedule_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse schedule dates into datetimes, vectorized.
+
+    Numbers are serial dates (days since 1899-12-30, as rendered by
+    SERIAL_NUMBER); strings are day-first dates or serials typed as text.
+    """
+    numeric = _numeric_cells(values)
+    serial_dates = pd.Timestamp("1899-12-30") + pd.to_timedelta(numeric.floordiv(1), unit="D")
+    text = values.where(numeric.isna(), "").astype(str).str.strip()
+
+    # Day-first strings: split into parts and map month tokens through the table
+    parts = text.str.extract(DATE_PATTERN)
+    month_token = parts[1].str[:3].str.lower()
+    month = pd.to_numeric(parts[1], errors="coerce").fillna(month_token.map(MONTH_TOKENS))
+    year = pd.to_numeric(parts[2], errors="coerce")
+    year = year.where(year >= 100, year + 2000)
+    dates = pd.to_datetime(
+        pd.DataFrame({"year": year, "month": month, "day": pd.to_numeric(parts[0], errors="coerce")}),
+        errors="coerce",
+    )
+
+    # Excel serial date format
+    serial = pd.to_numeric(text.where(text.str.fullmatch(r"\d{4,6}")), errors="coerce")
+    dates = dates.fillna(pd.Timestamp("1899-12-30") + pd.to_timedelta(serial, unit="D"))
+
+    # Anything else falls back to pandas' generic parser (normally no rows)
+    leftover = dates.isna() & (text != "")
+    if leftover.any():
+        dates.loc[leftover] = pd.to_datetime(text[leftover], dayfirst=True, errors="coerce")
+    return dates.fillna(serial_dates)
+
+
+def format_times(values: pd.Series) -> pd.Series:
+    """Render time serials (fraction of a day) as "HH.MM"; text is kept as is."""
+    numeric = _numeric_cells(values)
+    minutes = (numeric % 1 * 24 * 60).round()
+    clock = (
+        (minutes // 60).astype("Int64").astype(str).str.zfill(2)
+        + "."
+        + (minutes % 60).astype("Int64").astype(str).str.zfill(2)
+    )
+    return clock.where(numeric.notna(), cell_text(values))
+
+
+def cell_text(values: pd.Series) -> pd.Series:
+    """Unformatted cells as text (whole numbers without the trailing ".0")."""
+    return values.map(
+        lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v)
+    )
+
+
+def liturgical_years(dates: pd.Series) -> pd.Series:
+    """Determine the liturgical year (A, B, or C) based on Advent, vectorized."""
+    years = dates.dt.year
+    valid_years = years.dropna().astype(int)
+    if valid_years.empty:
+        return pd.Series("", index=dates.index)
+
+    # One Advent date per calendar year in range
+    advent_table = {
+        year: get_first_advent(year)
+        for year in range(valid_years.min(), valid_years.max() + 1)
+    }
+    first_advent = pd.to_datetime(years.map(advent_table))
+    lit_year = years + (dates >= first_advent).astype(int)
+    letters = pd.Series(LITURGICAL_YEAR_LETTERS).reindex((lit_year % 3).values)
+    return pd.Series(letters.values, index=dates.index).fillna("")
+
+
+def _block(rows: list[list], columns: list[str]) -> pd.DataFrame:
+    """DataFrame of a batch_get block; ragged rows (trailing blanks omitted) are padded."""
+    width = len(columns)
+    return pd.DataFrame(
+        [list(row[:width]) + [""] * (width - len(row)) for row in rows], columns=columns
+    )
+
+
+# Date and time cells as the sheet shows them
+SHOWN_COLUMNS = ["B_shown", "C_shown"]
+
+
+def _shown(rows: list[list] | None, length: int) -> pd.DataFrame:
+    """Formatted (date, time) cells aligned with a block of `length` rows; "" where missing."""
+    rows = list(rows or [])[:length]
+    return _block(rows + [[]] * (length - len(rows)), SHOWN_COLUMNS)
+
+
+def build_schedule(
+    main_rows: list[list],
+    extra_rows: list[list],
+    main_shown: list[list] | None = None,
+    extra_shown: list[list] | None = None,
+) -> pd.DataFrame:
+    """
+    Turn the source blocks into the upcoming, cleaned schedule (df_clean).
+
+    `main_rows` is the B..K block and `extra_rows` the O..R block as
+    returned by `load_source_values` (unformatted: dates and times may be
+    serial numbers); they are only used to parse dates. `main_shown` /
+    `extra_shown` are the formatted date and time columns of the same rows,
+    shown as is in Tanggal and Jam. Without them every date is shown as
+    dd/mm/yyyy and serial times as HH.MM.
+    """
+    # Extract main data columns
+    df = _block(main_rows, ["B", "C", "D", "E", "F", "G", "H", "I", "J", "K"])
+    df[SHOWN_COLUMNS] = _shown(main_shown, len(df)).values
+
+    # Override columns F,G if J,K are filled
+    mask_j = cell_text(df["J"]).str.strip() != ""
+    df.loc[mask_j, ["F", "G"]] = df.loc[mask_j, ["J", "K"]].values
+    # cleaning unused field
+    df = df[["B", "C", "D", "E", "F", "G", *SHOWN_COLUMNS]]
+
+    target_date = datetime(datetime.now().year, 12, 25)
+    today = datetime.now()
+    if today < target_date:
+        # Extract extra data (second schedule section)
+        df_extra = _block(extra_rows, ["O", "P", "Q", "R"])
+        df_extra[SHOWN_COLUMNS] = _shown(extra_shown, len(df_extra)).values
+        df_extra["B"], df_extra["C"], df_extra["F"], df_extra["G"] = df_extra["O"], df_extra["P"], df_extra["Q"], df_extra["R"]
+        df_extra["D"], df_extra["E"] = "", ""
+        df_extra = df_extra[["B", "C", "D", "E", "F", "G", *SHOWN_COLUMNS]]
+
+        # Merge both sections
+        df_all = pd.concat([df, df_extra], ignore_index=True)
+    else:
+        df_all = df
+
+    # Convert dates
+    df_all["B_dt"] = parse_schedule_dates(df_all["B"])
+    today_jkt = datetime.now(ZoneInfo(TIMEZONE)).date()
+    df_all = (
+        df_all[df_all["B_dt"] >= pd.Timestamp(today_jkt)]
+        .copy()
+        .sort_values("B_dt")
+        .reset_index(drop=True)
+    )
+
+    # Clean and standardize columns (typed cells back to text)
+    df_clean = df_all[["B", "C", "D", "E", "F", "G", "B_dt"]].copy()
+    # Dates and times as the sheet shows them; serials only where that is unknown
+    shown_date, shown_time = (df_all[c].astype(str).str.strip() for c in SHOWN_COLUMNS)
+    df_clean["B"] = shown_date.where(shown_date != "", df_clean["B_dt"].dt.strftime("%d/%m/%Y"))
+    df_clean["C"] = shown_time.where(shown_time != "", format_times(df_clean["C"]))
+    for column in ["D", "E", "F", "G"]:
+        df_clean[column] = cell_text(df_clean[column])
+    df_clean.columns = [
+        "Tanggal",
+        "Jam",
+        "Anamnesis",
+        "Cara Tobat",
+        "Koor",
+        "Organis",
+        "tgl-format",
+    ]
+    df_clean["Tahun Liturgi"] = liturgical_years(df_clean["tgl-format"])
+
+    # Day name (Indonesian) from a 7-entry table
+    dayofweek = df_clean["tgl-format"].dt.dayofweek
+    df_clean["Hari"] = dayofweek.map(dict(enumerate(INDONESIAN_DAY_NAMES))).fillna("")
+    df_clean["Weekday"] = (dayofweek < 5).map({True: "yes", False: "no"})
+
+    return df_clean
+
+
+def partition_by_role(
+    df: pd.DataFrame, roles, rosters: dict[str, list[dict]]
+) -> tuple[dict[str, dict[str, pd.DataFrame]], dict[str, pd.DataFrame]]:
+    """
+    Split the schedule into one partition per person of every role in one pass.
+
+    The role columns ("Organis", "Koor", ...) are stacked into a single
+    (role, lowercased name) key and grouped once, so another role adds a
+    column to the same groupby instead of another scan of the schedule.
+
+    Returns ({role: {lowercased name: rows in OUTPUT_COLUMNS order +
+    'tgl-format'}}, {role: rows whose name is not in the role's roster}).
+    People without rows get an empty partition.
+    """
+    ordered = df[OUTPUT_COLUMNS + ["tgl-format"]]
+    keys = pd.concat(
+        [df[role.column].astype(str).str.strip().str.lower() for role in roles],
+        keys=[role.name for role in roles],
+    )
+    role_names = keys.index.get_level_values(0)
+    groups = keys.groupby([role_names, keys.values], sort=False).indices
+
+    empty = ordered.iloc[0:0]
+    partitions, unmatched = {}, {}
+    for i, role in enumerate(roles):
+        known = {rec["name"].lower() for rec in rosters.get(role.name, [])}
+        # Positions in the stacked keys; each role's block is len(df) long
+        partitions[role.name] = {
+            name: ordered.iloc[groups[(role.name, name)] - i * len(df)]
+            if (role.name, name) in groups
+            else empty
+            for name in known
+        }
+        key = keys.iloc[i * len(df):(i + 1) * len(df)].set_axis(df.index)
+        unmatched[role.name] = df[~key.isin(known) & (key != "")]
+    return partitions, unmatched
+
+
+def output_valid_through(df_clean: pd.DataFrame) -> date:
+    """Last day the published tabs and reminders stay correct without a rerun."""
+    today = datetime.now(ZoneInfo(TIMEZONE)).date()
+    # The liturgical calendar link (L2) changes with the month
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    if df_clean.empty:
+        return today
+    # The earliest scheduled date drops off the tabs the day after it
+    return min(df_clean["tgl-format"].min().date(), month_end)
@@ -0,0 +1,60 @@
+import pandas as pd
+
+from pipeline.config import OUTPUT_COLUMNS, Role
+from utils.metrics import get_metrics
+from utils.sheet_publisher import TabPublisher
+
+
+def tab_title(name: str, prefix: str = "Jadwal") -> str:
+    """Worksheet title of a person's schedule tab."""
+    return f"{prefix} {name.capitalize()}"
+
+
+def report_unmatched(roles: tuple[Role, ...], unmatched: dict[str, pd.DataFrame]) -> None:
+    """Print, per role, schedule rows whose name is not in the role's roster."""
+    for role in roles:
+        rows = unmatched.get(role.name)
+        if rows is None or rows.empty:
+            continue
+        counts = rows[role.column].str.strip().value_counts()
+        print(
+            f"⚠️ {len(rows)} schedule rows have a '{role.column}' name not in "
+            f"'{role.roster_worksheet}': "
+            + ", ".join(f"{name} ({count})" for name, count in counts.items()),
+            flush=True,
+        )
+
+
+def publish_tabs(
+    spreadsheet,
+    roles: tuple[Role, ...],
+    rosters: dict[str, list[dict]],
+    partitions: dict[str, dict[str, pd.DataFrame]],
+    dry_run: bool = False,
+    parish_name: str = "default",
+) -> None:
+    """Write every person's "<prefix> <Name>" tab, for all roles, in one batched publish."""
+    publisher = TabPublisher(spreadsheet)
+    tabs, owners = [], {}
+    for role in roles:
+        for rec in rosters.get(role.name, []):
+            title = tab_title(rec["name"], role.tab_prefix)
+            # The publisher keys tabs by title: two roles must never share one
+            if owners.setdefault(title, role.name) != role.name:
+                raise ValueError(
+                    f"Tab '{title}' would be written by both the {owners[title]} "
+                    f"and {role.name} roles; give one of them another tab_prefix."
+                )
+            tabs.append((title, partitions[role.name][rec["name"].lower()]))
+    for title, filter_df in tabs:
+        publisher.add(title, filter_df[OUTPUT_COLUMNS])
+
+    if dry_run:
+        for title, filter_df in tabs:
+            print(f"🧪 [dry-run] Would save {len(filter_df)} rows to: {title}", flush=True)
+        return
+
+    with get_metrics().stage("publish", parish=parish_name):
+        result = publisher.publish()
+    for state, titles in result.items():
+        get_metrics().count("tabs", len(titles), parish=parish_name, state=state)
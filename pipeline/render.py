@@ -0,0 +1,134 @@
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+
+import pandas as pd
+from babel import Locale
+from babel.dates import format_date
+
+from pipeline.config import LANGUAGE, SCHEDULE_LINK
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+# The schedule hash is built from these lines whatever the template says,
+# so rewording a template never re-sends an unchanged schedule
+HASH_LINE = Template("- $day, $date • $time (Koor: $choir)")
+HASH_LANGUAGE = "id"
+
+
+@lru_cache(maxsize=None)
+def get_locale(language: str) -> Locale:
+    """Parsed babel locale, loaded once per language."""
+    return Locale.parse(language)
+
+
+@lru_cache(maxsize=4096)
+def format_schedule_date(value: date, language: str) -> tuple[str, str]:
+    """(day name, long date) of a schedule date, e.g. ("Minggu", "6 Januari 2030")."""
+    locale = get_locale(language)
+    return format_date(value, "EEEE", locale=locale), format_date(value, "d MMMM y", locale=locale)
+
+
+@lru_cache(maxsize=None)
+def load_template(path: Path) -> Template:
+    return Template(path.read_text(encoding="utf-8").rstrip("\n"))
+
+
+@dataclass
+class Reminder:
+    """Rendered reminder of one organist: a text per platform and the schedule hash."""
+
+    name: str
+    hash_value: str
+    texts: dict[str, str] = field(default_factory=dict)
+
+
+class ReminderRenderer:
+    """
+    Render reminder messages from the templates in `templates/`.
+
+    Templates are looked up as `<kind>.<platform>.<language>.txt`, falling
+    back to `<kind>.<language>.txt`, and compiled once. `<template>` (a
+    role's template, "reminder" for organists) gets $name, $schedule and
+    $link; `<template>_line` gets $day, $date, $time, $choir and $organist
+    for each of the next `upcoming` dates. The schedule hash is built from
+    `hash_line` (default HASH_LINE).
+    """
+
+    def __init__(
+        self,
+        language: str = LANGUAGE,
+        link: str = SCHEDULE_LINK,
+        templates_dir: str | Path = TEMPLATES_DIR,
+        upcoming: int = 3,
+        template: str = "reminder",
+        hash_line: str | None = None,
+    ):
+        self.language = language
+        self.kind = template
+        self.hash_line = Template(hash_line) if hash_line else HASH_LINE
+        self.link = link
+        self.templates_dir = Path(templates_dir)
+        self.upcoming = upcoming
+
+    def template(self, kind: str, platform: str) -> Template:
+        for path in (
+            self.templates_dir / f"{kind}.{platform}.{self.language}.txt",
+            self.templates_dir / f"{kind}.{self.language}.txt",
+        ):
+            if path.exists():
+                return load_template(path)
+        raise FileNotFoundError(f"No '{kind}' template for language '{self.language}'")
+
+    @staticmethod
+    def _rows(schedule: pd.DataFrame, language: str) -> list[dict]:
+        rows = []
+        for value, jam, koor, organis in zip(
+            schedule["tgl-format"], schedule["Jam"], schedule["Koor"], schedule["Organis"]
+        ):
+            if pd.isnull(value):
+                continue
+            day, long_date = format_schedule_date(value.date(), language)
+            rows.append(
+                {
+                    "day": day,
+                    "date": long_date,
+                    "time": str(jam).strip() if pd.notnull(jam) else "",
+                    "choir": str(koor).strip() if pd.notnull(koor) else "-",
+                    "organist": str(organis).strip() if pd.notnull(organis) else "-",
+                }
+            )
+        return rows
+
+    def render(self, name: str, schedule: pd.DataFrame, platforms: list[str]) -> Reminder:
+        """Render one person's reminder for every platform."""
+        upcoming = schedule.head(self.upcoming)
+        hash_rows = self._rows(upcoming, HASH_LANGUAGE)
+        rows = hash_rows if self.language == HASH_LANGUAGE else self._rows(upcoming, self.language)
+
+        reminder = Reminder(
+            name=name, hash_value="|".join(self.hash_line.substitute(row) for row in hash_rows)
+        )
+        for platform in platforms:
+            line = self.template(f"{self.kind}_line", platform)
+            reminder.texts[platform] = self.template(self.kind, platform).substitute(
+                name=name.capitalize(),
+                schedule="\n".join(line.substitute(row) for row in rows),
+                link=self.link,
+            )
+        return reminder
+
+    def render_all(
+        self,
+        records: list[dict],
+        partitions: dict[str, pd.DataFrame],
+        platforms: list[str],
+    ) -> dict[str, Reminder]:
+        """Render everyone in a roster with upcoming dates in one pass, keyed by lowercased name."""
+        return {
+            rec["name"].lower(): self.render(rec["name"], partitions[rec["name"].lower()], platforms)
+            for rec in records
+            if not partitions[rec["name"].lower()].empty
+        }
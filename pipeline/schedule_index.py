@@ -0,0 +1,252 @@
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+
+import pandas as pd
+
+from pipeline.preprocess import INDONESIAN_DAY_NAMES
+
+
+@dataclass(frozen=True, order=True)
+class ScheduleEntry:
+    """One scheduled mass; ordered by date, then time."""
+
+    date: date
+    jam: str
+    hari: str
+    koor: str
+    organis: str
+    anamnesis: str = ""
+    cara_tobat: str = ""
+    # (column, value) of indexed role columns without a field of their own
+    extra: tuple[tuple[str, str], ...] = ()
+
+    def get(self, column: str) -> str:
+        """The value of a schedule column ("Organis", "Koor", ...); "" if not kept."""
+        if column in FIELD_BY_COLUMN:
+            return getattr(self, FIELD_BY_COLUMN[column])
+        return dict(self.extra).get(column, "")
+
+
+FIELD_BY_COLUMN = {
+    "Jam": "jam",
+    "Hari": "hari",
+    "Koor": "koor",
+    "Organis": "organis",
+    "Anamnesis": "anamnesis",
+    "Cara Tobat": "cara_tobat",
+}
+
+# Role columns every index covers (/jadwal <organist> and /koor)
+DEFAULT_ROLE_COLUMNS = ("Organis", "Koor")
+
+
+def _key(value: str) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+def normalize_time(value: str) -> str:
+    """"8:00", "08.00" and "0800" all become "08.00"."""
+    digits = "".join(ch for ch in str(value) if ch.isdigit())
+    if len(digits) in (3, 4):
+        return f"{int(digits[:-2]):02d}.{digits[-2:]}"
+    if digits and len(digits) <= 2:
+        return f"{int(digits):02d}.00"
+    return str(value).strip()
+
+
+def entries_from_schedule(
+    df_clean: pd.DataFrame, extra_columns: tuple[str, ...] = ()
+) -> list[ScheduleEntry]:
+    """
+    The rows of `build_schedule`'s output as entries (rows without a date are
+    dropped); `extra_columns` are kept in `ScheduleEntry.extra`.
+    """
+    columns = ["tgl-format", "Jam", "Hari", "Koor", "Organis", "Anamnesis", "Cara Tobat"]
+    extra_columns = [c for c in extra_columns if c not in FIELD_BY_COLUMN]
+    entries = []
+    for value, jam, hari, koor, organis, anamnesis, cara_tobat, *extra in zip(
+        *(df_clean[column] for column in columns + extra_columns)
+    ):
+        if pd.isnull(value):
+            continue
+        entries.append(
+            ScheduleEntry(
+                date=value.date(),
+                jam=str(jam).strip(),
+                hari=str(hari).strip(),
+                koor=str(koor).strip(),
+                organis=str(organis).strip(),
+                anamnesis=str(anamnesis).strip(),
+                cara_tobat=str(cara_tobat).strip(),
+                extra=tuple(zip(extra_columns, (str(v).strip() for v in extra))),
+            )
+        )
+    return entries
+
+
+class ScheduleIndex:
+    """
+    In-memory index of the upcoming schedule for interactive queries.
+
+    Entries are kept sorted by (date, time) in one array, with hash indexes
+    (lowercased name per role column, weekday 0=Monday) pointing to sorted
+    posting lists of the same entries. `role_columns` are the configured
+    roles' columns; "Organis" and "Koor" are always indexed. Date ranges are answered by
+    bisecting, so every query costs O(log n + results).
+
+    `update()` applies only the rows that were added or removed since the
+    previous schedule; reads and updates are guarded by a lock so the
+    Telegram handlers can query while the daemon refreshes.
+    """
+
+    def __init__(self, role_columns=()):
+        self._lock = threading.Lock()
+        self.role_columns = tuple(dict.fromkeys([*DEFAULT_ROLE_COLUMNS, *role_columns]))
+        self._entries: list[ScheduleEntry] = []
+        self._by_column: dict[str, dict[str, list[ScheduleEntry]]] = {
+            column: {} for column in self.role_columns
+        }
+        self._by_organist = self._by_column["Organis"]
+        self._by_choir = self._by_column["Koor"]
+        self._by_weekday: dict[int, list[ScheduleEntry]] = {}
+        self._contacts: dict[str, list[tuple[str, str]]] = {}
+        self.updated_at: date | None = None
+
+    @classmethod
+    def from_schedule(cls, df_clean: pd.DataFrame, contacts: dict | None = None, role_columns=()):
+        index = cls(role_columns)
+        index.update(df_clean, contacts)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ----- maintenance -----
+    def _postings(self, entry: ScheduleEntry):
+        for column, index in self._by_column.items():
+            yield index, _key(entry.get(column))
+        yield self._by_weekday, entry.date.weekday()
+
+    def _insert(self, entry: ScheduleEntry) -> None:
+        self._entries.insert(bisect_left(self._entries, entry), entry)
+        for index, key in self._postings(entry):
+            postings = index.setdefault(key, [])
+            postings.insert(bisect_left(postings, entry), entry)
+
+    def _remove(self, entry: ScheduleEntry) -> None:
+        del self._entries[bisect_left(self._entries, entry)]
+        for index, key in self._postings(entry):
+            postings = index[key]
+            del postings[bisect_left(postings, entry)]
+            if not postings:
+                del index[key]
+
+    def update(
+        self, df_clean: pd.DataFrame, contacts: dict[str, list[tuple[str, str]]] | None = None
+    ) -> tuple[int, int]:
+        """
+        Bring the index in line with a new schedule (and, if given, the
+        `contacts_by_chat` map); return the (added, removed) entry counts.
+        """
+        new_entries = entries_from_schedule(df_clean, self.role_columns)
+        with self._lock:
+            # Sets: a duplicated source row is indexed once
+            current, new = set(self._entries), set(new_entries)
+            removed, added = current - new, new - current
+            for entry in removed:
+                self._remove(entry)
+            for entry in added:
+                self._insert(entry)
+            if contacts is not None:
+                self._contacts = contacts
+            self.updated_at = date.today()
+        return len(added), len(removed)
+
+    # ----- queries -----
+    @staticmethod
+    def _range(entries: list[ScheduleEntry], start: date | None, end: date | None) -> list:
+        lo = bisect_left(entries, start, key=lambda e: e.date) if start else 0
+        hi = bisect_right(entries, end, key=lambda e: e.date) if end else len(entries)
+        return entries[lo:hi]
+
+    def between(self, start: date | None = None, end: date | None = None) -> list[ScheduleEntry]:
+        """Entries dated from `start` to `end`, both inclusive."""
+        with self._lock:
+            return self._range(self._entries, start, end)
+
+    def on(self, day: date, time: str | None = None) -> list[ScheduleEntry]:
+        """Entries on `day`, optionally only at `time` ("08.00")."""
+        entries = self.between(day, day)
+        if time:
+            entries = [e for e in entries if normalize_time(e.jam) == normalize_time(time)]
+        return entries
+
+    def _lookup(self, index: dict, name: str) -> list[ScheduleEntry]:
+        key = _key(name)
+        if key in index:
+            return index[key]
+        # "cecilia" finds "Koor Cecilia"
+        matches = [postings for candidate, postings in index.items() if key and key in candidate]
+        return sorted(entry for postings in matches for entry in postings)
+
+    def for_organist(
+        self, name: str, start: date | None = None, end: date | None = None
+    ) -> list[ScheduleEntry]:
+        with self._lock:
+            return self._range(self._lookup(self._by_organist, name), start, end)
+
+    def for_choir(
+        self, name: str, start: date | None = None, end: date | None = None
+    ) -> list[ScheduleEntry]:
+        with self._lock:
+            return self._range(self._lookup(self._by_choir, name), start, end)
+
+    def on_weekday(
+        self, weekday: int, start: date | None = None, end: date | None = None
+    ) -> list[ScheduleEntry]:
+        """Entries on a weekday (0=Monday … 6=Sunday)."""
+        with self._lock:
+            return self._range(self._by_weekday.get(weekday, []), start, end)
+
+    def next_on_weekday(self, weekday: int, start: date, time: str | None = None) -> list:
+        """Entries of the first date on or after `start` falling on `weekday`."""
+        entries = self.on_weekday(weekday, start)
+        if not entries:
+            return []
+        return self.on(entries[0].date, time)
+
+    def for_person(
+        self, column: str, name: str, start: date | None = None, end: date | None = None
+    ) -> list[ScheduleEntry]:
+        """Entries of `name` in a role column; [] for a column that is not indexed."""
+        if column not in self._by_column:
+            return []
+        with self._lock:
+            return self._range(self._lookup(self._by_column[column], name), start, end)
+
+    def roles_for_chat(self, chat_id) -> list[tuple[str, str]]:
+        """(role column, roster name) pairs a Telegram chat id is listed under."""
+        return self._contacts.get(str(chat_id), [])
+
+    def organists(self) -> list[str]:
+        with self._lock:
+            return sorted({entry.organis for postings in self._by_organist.values() for entry in postings})
+
+
+def parse_weekday(value: str) -> int | None:
+    """Index (0=Monday) of an Indonesian day name ("minggu", "Sabtu"), or None."""
+    names = [name.lower() for name in INDONESIAN_DAY_NAMES]
+    value = value.strip().lower()
+    return names.index(value) if value in names else None
+
+
+def contacts_by_chat(roles, rosters: dict[str, list[dict]]) -> dict[str, list[tuple[str, str]]]:
+    """{Telegram chat id: [(role column, roster name), ...]} over every role's roster."""
+    contacts: dict[str, list[tuple[str, str]]] = {}
+    for role in roles:
+        for rec in rosters.get(role.name, []):
+            if rec.get("chat_id"):
+                contacts.setdefault(str(rec["chat_id"]), []).append((role.column, rec["name"]))
+    return contacts
@@ -0,0 +1,226 @@
+import asyncio
+from contextlib import nullcontext
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from google.auth.transport.requests import Request
+
+from helpers.credentials import get_credential_provider
+from pipeline.config import DEFAULT_PARISH, SCOPES, TIMEZONE, ParishConfig
+from pipeline.load import load_rosters, load_source_values
+from pipeline.notify import retry_outbox, send_notifications_reminders
+from pipeline.preprocess import build_schedule, output_valid_through, partition_by_role
+from pipeline.publish import publish_tabs, report_unmatched
+from pipeline.schedule_index import ScheduleIndex, contacts_by_chat
+from pipeline.status import check_whatsapp_status, send_admin_alert
+from utils.change_detection import ChangeDetector, default_state_path
+from utils.metrics import get_metrics
+from utils.rate_limit import TokenBucket
+from utils.whatsapp_bot import AsyncWhatsAppBot
+
+
+def parse_daily_at(value: str) -> time:
+    """Parse "HH:MM" (Asia/Jakarta) into a time."""
+    hour, minute = value.strip().split(":")
+    return time(int(hour), int(minute))
+
+
+def next_daily_run(now: datetime, at: time) -> datetime:
+    """The next occurrence of `at` strictly after `now` (same timezone as `now`)."""
+    candidate = now.replace(hour=at.hour, minute=at.minute, second=0, microsecond=0)
+    return candidate if candidate > now else candidate + timedelta(days=1)
+
+
+def refresh_credentials(client, margin: timedelta = timedelta(minutes=5)) -> bool:
+    """
+    Refresh the client's OAuth token if it expires within `margin`.
+
+    google-auth only refreshes lazily on the next request; doing it ahead of
+    time keeps a long-lived process from hitting an expired token mid-run.
+    Credentials from the shared provider also update the token cache.
+    Returns True if a refresh happened (clients without credentials, like the
+    offline fake, are ignored).
+    """
+    creds = getattr(getattr(client, "http_client", None), "auth", None)
+    if creds is None or not hasattr(creds, "refresh"):
+        return False
+
+    provider = get_credential_provider(SCOPES)
+    if provider.manages(creds):
+        return provider.refresh(margin)
+
+    expiry = getattr(creds, "expiry", None)
+    # google-auth stores expiry as naive UTC
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if creds.valid and expiry is not None and expiry - now > margin:
+        return False
+
+    creds.refresh(Request())
+    print(f"🔑 Google credentials refreshed (valid until {creds.expiry} UTC)", flush=True)
+    return True
+
+
+class ScheduleDaemon:
+    """
+    Long-running `serve` mode.
+
+    Keeps the authorized client, the output spreadsheet, the WhatsApp
+    connection pool and the parsed schedule in memory. Runs the full
+    pipeline (tabs + reminders) once a day at `daily_at`, and between runs
+    polls the Drive fingerprints every `poll_seconds` so schedule edits are
+    published within minutes, and failed reminders in the outbox are retried
+    as their backoff ends. The parsed schedule is only rebuilt when the
+    fingerprints or the date change; with an `index`, each rebuild is also
+    applied to it so interactive queries see the current schedule.
+    """
+
+    def __init__(
+        self,
+        client,
+        daily_at: time,
+        poll_seconds: float,
+        dry_run: bool = False,
+        parish: ParishConfig = DEFAULT_PARISH,
+        buckets: dict[str, TokenBucket] | None = None,
+        index: ScheduleIndex | None = None,
+    ):
+        self.client = client
+        self.daily_at = daily_at
+        self.poll_seconds = poll_seconds
+        self.dry_run = dry_run
+        self.parish = parish
+        self.buckets = buckets
+        self.index = index
+        self.tz = ZoneInfo(TIMEZONE)
+
+        # Opened by the first serve iteration, so a bad id or API error there is retried
+        self.spreadsheet = None
+        self.change_detector = ChangeDetector(
+            client,
+            [parish.spreadsheet_id, parish.spreadsheet_id_output],
+            state_path=parish.scoped_path(default_state_path()),
+            written_ids=[parish.spreadsheet_id_output],
+        )
+        self._schedule_key = None
+        self._schedule = None
+
+    def load_schedule(self, fingerprints: dict):
+        """Return (rosters, df_clean, partitions), rebuilt only on changes."""
+        key = (datetime.now(self.tz).date(), repr(fingerprints))
+        if key != self._schedule_key:
+            if hasattr(self.client, "invalidate"):
+                # Tabs may have been added, renamed or removed by hand since the last run
+                self.client.invalidate()
+            rosters = load_rosters(self.client, self.parish)
+            source = load_source_values(self.client, self.parish)
+            with get_metrics().stage("preprocess", parish=self.parish.name):
+                df_clean = build_schedule(*source)
+                partitions, unmatched = partition_by_role(df_clean, self.parish.roles, rosters)
+            report_unmatched(self.parish.roles, unmatched)
+            if self.index is not None:
+                contacts = contacts_by_chat(self.parish.roles, rosters)
+                added, removed = self.index.update(df_clean, contacts)
+                print(
+                    f"🗂 [{self.parish.name}] Schedule index: +{added} / -{removed} entries",
+                    flush=True,
+                )
+            self._schedule = (rosters, df_clean, partitions)
+            self._schedule_key = key
+        return self._schedule
+
+    async def open_output(self):
+        """The output spreadsheet, opened (off the event loop) on first use."""
+        if self.spreadsheet is None:
+            self.spreadsheet = await asyncio.to_thread(
+                self.client.open_by_key, self.parish.spreadsheet_id_output
+            )
+        return self.spreadsheet
+
+    async def run_once(self, whatsAppBot: AsyncWhatsAppBot, notify: bool) -> None:
+        """Publish the tabs and, if `notify`, send reminders."""
+        with get_metrics().run(parish=self.parish.name):
+            await self._run_once(whatsAppBot, notify)
+
+    async def _run_once(self, whatsAppBot: AsyncWhatsAppBot, notify: bool) -> None:
+        await self.open_output()
+        fingerprints = await asyncio.to_thread(self.change_detector.current_fingerprints)
+        rosters, df_clean, partitions = await asyncio.to_thread(
+            self.load_schedule, fingerprints
+        )
+        await asyncio.to_thread(
+            publish_tabs,
+            self.spreadsheet,
+            self.parish.roles,
+            rosters,
+            partitions,
+            self.dry_run,
+            self.parish.name,
+        )
+
+        if notify and self.parish.notify:
+            error_msg = (
+                await check_whatsapp_status(whatsAppBot) if self.parish.sends_whatsapp else None
+            )
+            if error_msg is not None:
+                print(f"WhatsApp API is unavailable: {error_msg}", flush=True)
+                if not self.dry_run:
+                    await send_admin_alert(error_msg, self.parish.admin_chat_id)
+                return
+            await send_notifications_reminders(
+                self.spreadsheet,
+                rosters,
+                partitions,
+                self.dry_run,
+                whatsAppBot,
+                parish=self.parish,
+                buckets=self.buckets,
+            )
+
+        if not self.dry_run:
+            await asyncio.to_thread(self.change_detector.commit, output_valid_through(df_clean))
+
+    async def serve_forever(self) -> None:
+        next_run = next_daily_run(datetime.now(self.tz), self.daily_at)
+        print(
+            f"🕰 Serving {self.parish.name}: daily run at {self.daily_at:%H:%M} {TIMEZONE}, "
+            f"polling for changes every {self.poll_seconds:g}s (next run {next_run:%Y-%m-%d %H:%M})",
+            flush=True,
+        )
+
+        if self.index is not None:
+            # Warm the index so queries are answered before the first run
+            try:
+                fingerprints = await asyncio.to_thread(self.change_detector.current_fingerprints)
+                await asyncio.to_thread(self.load_schedule, fingerprints)
+            except Exception as e:
+                print(f"⚠️ [{self.parish.name}] Schedule index not loaded: {e}", flush=True)
+
+        # Telegram-only parishes never open (or need the settings of) a WhatsApp client
+        bot_context = AsyncWhatsAppBot() if self.parish.sends_whatsapp else nullcontext()
+        async with bot_context as whatsAppBot:
+            while True:
+                try:
+                    await asyncio.to_thread(refresh_credentials, self.client)
+                    await self.open_output()
+                    now = datetime.now(self.tz)
+
+                    if now >= next_run:
+                        print(f"🔁 [{self.parish.name}] Daily run", flush=True)
+                        await self.run_once(whatsAppBot, notify=True)
+                        next_run = next_daily_run(datetime.now(self.tz), self.daily_at)
+                    elif not await asyncio.to_thread(self.change_detector.is_unchanged, now.date()):
+                        print(f"🔁 [{self.parish.name}] Source changed, syncing tabs", flush=True)
+                        await self.run_once(whatsAppBot, notify=False)
+
+                    if self.parish.notify and not self.dry_run:
+                        # Reminders that failed earlier are retried once their backoff ends
+                        await retry_outbox(self.spreadsheet, whatsAppBot, self.parish, self.buckets)
+                except Exception as e:
+                    # Keep serving; the next poll retries
+                    print(f"⚠️ [{self.parish.name}] Serve iteration failed: {e}", flush=True)
+
+                # Keep the JSON summary / Prometheus textfile current while serving
+                await asyncio.to_thread(get_metrics().flush)
+
+                seconds_to_run = (next_run - datetime.now(self.tz)).total_seconds()
+                await asyncio.sleep(max(1.0, min(self.poll_seconds, seconds_to_run)))
@@ -0,0 +1,51 @@
+from contextlib import nullcontext
+from datetime import datetime
+
+from pipeline.config import ADMIN_CHAT_ID
+from utils.whatsapp_bot import AsyncWhatsAppBot, WhatsAppAPIError, WhatsAppNetworkError
+
+
+async def check_whatsapp_status(whatsAppBot: AsyncWhatsAppBot | None = None) -> str | None:
+    """Return None if the WhatsApp API is connected, otherwise the error message."""
+    print("Checking WhatsApp connection status...")
+
+    try:
+        async with nullcontext(whatsAppBot) if whatsAppBot else AsyncWhatsAppBot() as bot:
+            status = await bot.get_status()
+    except (WhatsAppNetworkError, WhatsAppAPIError) as e:
+        return str(e)
+    except Exception as e:
+        return f"Unexpected Error: {str(e)}"
+
+    # Check if the 'connected' field is True
+    if status.get("connected") is True:
+        print("WhatsApp READY.")
+        return None
+
+    # Capture specific status from API if not connected
+    error_msg = status.get("whatsapp_status", "NOT CONNECTED")
+    print(f"WhatsApp status is: {error_msg}")
+    return error_msg
+
+
+async def send_admin_alert(error_msg: str, chat_id: str = ADMIN_CHAT_ID) -> None:
+    """Notify the admin on Telegram that the WhatsApp API is unavailable."""
+    # Imported here so a healthy status check never loads python-telegram-bot
+    from utils.telegram_bot import get_telegram_sender
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M UTC")
+    reminder_text = (
+        f"[{timestamp}]\n\n"
+        f"WhatsApp API is unavailable.\n\n"
+        f"Error:\n\"{error_msg}\""
+    )
+
+    print("Sending alert to Telegram...")
+    try:
+        result = await get_telegram_sender().send(chat_id, reminder_text)
+        if result.ok:
+            print("Telegram alert sent.")
+        else:
+            print(f"Failed to send Telegram: {result.error}")
+    except Exception as tel_err:
+        print(f"Failed to send Telegram: {tel_err}")
@@ -0,0 +1,151 @@
+import asyncio
+import re
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+from pipeline.config import TIMEZONE, ParishConfig
+from pipeline.render import format_schedule_date
+from pipeline.schedule_index import ScheduleEntry, ScheduleIndex, parse_weekday
+from utils.metrics import get_metrics
+from utils.telegram_bot import get_telegram_sender
+
+# Most entries listed in one reply
+MAX_RESULTS = 10
+
+HELP_TEXT = (
+    "Perintah jadwal:\n"
+    "/jadwal — jadwal Anda sendiri\n"
+    "/jadwal <nama organis>\n"
+    "/jadwal <tanggal> — mis. 24/12, 24/12/2030, hari ini, besok\n"
+    "/jadwal <hari> [jam] — mis. minggu 08.00\n"
+    "/koor <nama koor>"
+)
+
+DATE_PATTERN = re.compile(r"(\d{1,2})[/\-.](\d{1,2})(?:[/\-.](\d{2,4}))?")
+
+
+def parse_date(value: str, today: date) -> date | None:
+    """"hari ini", "besok", "dd/mm" (next occurrence) or "dd/mm/yyyy"; None otherwise."""
+    value = value.strip().lower()
+    if value == "hari ini":
+        return today
+    if value == "besok":
+        return today + timedelta(days=1)
+    match = DATE_PATTERN.fullmatch(value)
+    if not match:
+        return None
+    day, month, year = match.groups()
+    try:
+        if year:
+            year = int(year) + (2000 if len(year) == 2 else 0)
+            return date(year, int(month), int(day))
+        candidate = date(today.year, int(month), int(day))
+        return candidate if candidate >= today else candidate.replace(year=today.year + 1)
+    except ValueError:
+        return None
+
+
+class ScheduleCommands:
+    """
+    Answer `/jadwal` and `/koor` from the in-memory schedule indexes of the
+    served parishes, so a reply never waits on Google Sheets.
+
+    `answer()` is plain Python (no Telegram objects) and can be called
+    directly; `run()` serves it with long polling on the BOT_TOKEN bot.
+    """
+
+    def __init__(self, parishes: list[tuple[ParishConfig, ScheduleIndex]]):
+        self.parishes = parishes
+        self.tz = ZoneInfo(TIMEZONE)
+
+    def _format(self, parish: ParishConfig, entries: list[ScheduleEntry], show: str) -> list[str]:
+        lines = []
+        for entry in entries[:MAX_RESULTS]:
+            day, long_date = format_schedule_date(entry.date, parish.language)
+            who = entry.organis if show == "organist" else entry.koor
+            lines.append(f"- {day}, {long_date} • {entry.jam} — {who or '-'}")
+        if len(entries) > MAX_RESULTS:
+            lines.append(f"… dan {len(entries) - MAX_RESULTS} lainnya")
+        return lines
+
+    def _query(self, index: ScheduleIndex, command: str, query: str, chat_id, today: date):
+        """[(entries, which name to show per entry), ...] for one parish."""
+        if command == "koor":
+            return [(index.for_choir(query, start=today), "organist")]
+        if not query:
+            # Every role the chat is listed under; the organist is shown unless that is the role
+            return [
+                (
+                    index.for_person(column, name, start=today),
+                    "choir" if column == "Organis" else "organist",
+                )
+                for column, name in index.roles_for_chat(chat_id)
+            ]
+
+        if (day := parse_date(query, today)) is not None:
+            return [(index.on(day), "organist")]
+        words = query.split()
+        weekday = parse_weekday(words[0])
+        if weekday is not None and len(words) <= 2:
+            time = words[1] if len(words) == 2 else None
+            return [(index.next_on_weekday(weekday, today, time), "organist")]
+        return [(index.for_organist(query, start=today), "choir")]
+
+    def answer(self, command: str, query: str = "", chat_id=None) -> str:
+        """Reply text for `/<command> <query>` sent from `chat_id`."""
+        query = " ".join(query.split())
+        if command == "koor" and not query:
+            return HELP_TEXT
+        today = datetime.now(self.tz).date()
+
+        with get_metrics().stage("schedule_query", command=command):
+            sections = []
+            for parish, index in self.parishes:
+                lines = []
+                for entries, show in self._query(index, command, query, chat_id, today):
+                    lines.extend(self._format(parish, entries, show))
+                if not lines:
+                    continue
+                if len(self.parishes) > 1:
+                    lines.insert(0, f"📍 {parish.name}")
+                sections.append("\n".join(lines))
+
+        if sections:
+            return "\n\n".join(sections)
+        if command == "jadwal" and not query:
+            return "Chat ini belum terdaftar di data organis / koor.\n\n" + HELP_TEXT
+        return f"Tidak ada jadwal untuk \"{query}\"."
+
+    async def _handle(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        message = update.effective_message
+        if message is None or not message.text:
+            return
+        command = message.text.split()[0].lstrip("/").split("@")[0].lower()
+        text = self.answer(command, " ".join(context.args or []), update.effective_chat.id)
+        await message.reply_text(text)
+
+    async def _help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if update.effective_message is not None:
+            await update.effective_message.reply_text(HELP_TEXT)
+
+    def build_application(self) -> Application:
+        application = Application.builder().token(get_telegram_sender().token).build()
+        application.add_handler(CommandHandler(["jadwal", "koor"], self._handle))
+        application.add_handler(CommandHandler(["start", "help"], self._help))
+        return application
+
+    async def run(self) -> None:
+        """Serve the commands with long polling until cancelled."""
+        application = self.build_application()
+        async with application:
+            await application.start()
+            await application.updater.start_polling(drop_pending_updates=True)
+            print("🤖 Telegram commands /jadwal and /koor are being served", flush=True)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await application.updater.stop()
+                await application.stop()
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.fake_whatsapp import FakeWhatsAppConfig, FakeWhatsAppServer  # noqa: E402
+from utils.whatsapp_bot import AsyncWhatsAppBot, WhatsAppSendError, WhatsAppSendResult  # noqa: E402
+
+
+async def sequential(bot: AsyncWhatsAppBot, jobs: list[tuple[str, str]]) -> list:
+    """The old loop: one send at a time, waiting for each response."""
+    results = []
+    for number, message in jobs:
+        try:
+            results.append(WhatsAppSendResult(number, response=await bot.send(number, message)))
+        except WhatsAppSendError as e:
+            results.append(WhatsAppSendResult.from_exception(number, e))
+    return results
+
+
+async def send_many(bot: AsyncWhatsAppBot, jobs: list[tuple[str, str]]) -> list:
+    return await bot.send_many(jobs)
+
+
+# mode → (runner, `bulk` argument of the client)
+MODES = {
+    "sequential": (sequential, False),
+    "pipelined": (send_many, False),
+    "bulk": (send_many, True),
+}
+
+
+async def run(args) -> None:
+    jobs = [(f"0812{i:08d}", f"Benchmark message {i}") for i in range(args.messages)]
+    for mode in args.modes:
+        runner, use_bulk = MODES[mode]
+        async with AsyncWhatsAppBot(
+            args.url,
+            args.token,
+            max_concurrency=args.concurrency,
+            backoff=args.backoff,
+            bulk=use_bulk,
+        ) as bot:
+            start = time.perf_counter()
+            results = await runner(bot, jobs)
+            elapsed = time.perf_counter() - start
+        failed = sum(1 for result in results if not result.ok)
+        print(
+            f"📈 {mode:<10} {len(jobs)} messages in {elapsed:.2f}s "
+            f"({len(jobs) / elapsed:.1f} msg/s), {failed} failed",
+            flush=True,
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure WhatsApp send throughput against the local Baileys stand-in."
+    )
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4, help="Connections in the client pool.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--latency", type=float, default=0.05, help="Server seconds per request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of messages failing with 500.")
+    parser.add_argument("--rate-limit", type=float, help="Server messages per second before 429.")
+    parser.add_argument("--backoff", type=float, default=0.1)
+    parser.add_argument("--url", help="Benchmark a running server instead of the bundled stand-in.")
+    parser.add_argument("--token", default=FakeWhatsAppConfig.token)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        asyncio.run(run(args))
+        return
+
+    config = FakeWhatsAppConfig(
+        token=args.token,
+        latency=args.latency,
+        error_rates={500: args.error_rate} if args.error_rate else {},
+        rate_limit=args.rate_limit,
+        burst=max(1, int(args.rate_limit or 1)),
+    )
+    with FakeWhatsAppServer(config) as server:
+        args.url = server.send_url
+        asyncio.run(run(args))
+        print(f"📊 Server: {server.stats}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,539 +1,507 @@
+import argparse
 import asyncio
+import os
 import sys
-import random
-import nest_asyncio
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-
-import gspread
-import pandas as pd
-from babel.dates import format_date
-from dotenv import find_dotenv, load_dotenv
-from gspread.exceptions import WorksheetNotFound
-from pytz import timezone
+from pathlib import Path
 
 # =======================================
 # ENVIRONMENT SETUP & IMPORTS
 # =======================================
-sys.path.append("..")
-from helpers.connection import get_google_credentials
-from utils.number import normalize_number
-from utils.telegram_bot import TelegramBot
-from utils.whatsapp_bot import (
-    WhatsAppBot,
-    WhatsAppNetworkError,
-    WhatsAppAPIError
-)
-
-load_dotenv(find_dotenv())
+# Only stdlib at module level: heavy modules (pandas, babel, gspread,
+# telegram) are imported by the subcommands that need them.
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
 
 # =======================================
-# 1. HELPER FUNCTIONS
+# 1. PIPELINE STAGES
 # =======================================
+def connect(args):
+    """
+    Authorized gspread client (or the in-memory fake with --fake-sheets),
+    wrapped so every Sheets call goes through the quota-aware scheduler.
+    """
+    from utils.sheet_registry import SheetRegistry
+    from utils.sheets_scheduler import ScheduledProxy, SheetsScheduler
 
+    if args.fake_sheets:
+        from utils.fake_gsheets import FakeClient
 
-def get_first_advent(year: int) -> datetime:
-    """Return the date of the first Advent Sunday for the given year."""
-    dec_25 = datetime(year, 12, 25)
-    days_to_sunday = dec_25.weekday() + 1
-    return dec_25 - timedelta(days=days_to_sunday + 21)
+        client = FakeClient.from_json(args.fake_sheets)
+    else:
+        from pipeline.load import connect_sheets
 
+        client = connect_sheets()
 
-def liturgical_year(date: datetime) -> str:
-    """Determine the liturgical year (A, B, or C) based on Advent."""
-    year = date.year
-    first_advent = get_first_advent(year)
-    lit_year = year + 1 if date >= first_advent else year
-    mapping = {1: "A", 2: "B", 0: "C"}
-    return mapping[lit_year % 3]
+    from utils.metrics import get_metrics
 
+    args.sheets_scheduler = SheetsScheduler.from_env()
+    # Each spreadsheet is opened and its tabs listed once, however many stages use it
+    args.sheets_client = SheetRegistry(ScheduledProxy(client, args.sheets_scheduler))
+    get_metrics().add_collector(
+        lambda: {f"sheets_{name}": value for name, value in args.sheets_scheduler.stats().items()}
+    )
+    return args.sheets_client
 
-def is_number_match(stored_number: str, input_number: str, platform: str) -> bool:
-    """Check if stored number matches input number based on platform."""
-    if platform == "telegram":
-        return str(stored_number).strip() == str(input_number).strip()
-    else:
-        return (
-            str(normalize_number(stored_number)).strip()
-            == str(normalize_number(input_number)).strip()
+
+def report_api_calls(args) -> int:
+    """
+    Print the scheduler's quota/backoff counters and, with --fake-sheets, the
+    API-call summary; non-zero if over --max-api-calls.
+    """
+    scheduler = getattr(args, "sheets_scheduler", None)
+    if scheduler is None:
+        return 0
+    print(f"⏳ Sheets scheduler: {scheduler.stats()}", flush=True)
+
+    client = args.sheets_client.unwrapped
+    if not hasattr(client, "calls"):
+        return 0
+
+    summary = client.calls.summary()
+    print(f"📊 Sheets API calls: {summary}", flush=True)
+    if args.max_api_calls is not None and summary["total"] > args.max_api_calls:
+        print(
+            f"❌ {summary['total']} API calls exceeds the budget of {args.max_api_calls}",
+            flush=True,
         )
+        return 2
+    return 0
+
+
+def load_and_preprocess(client, parish, profile: bool = False):
+    """Load every role's roster and the source sheet, return (rosters, df_clean, partitions)."""
+    from pipeline.load import load_rosters, load_source_values
+    from pipeline.preprocess import build_schedule, partition_by_role
+    from pipeline.publish import report_unmatched
+    from utils.metrics import get_metrics, profile_stage
 
+    rosters = load_rosters(client, parish)
+    source = load_source_values(client, parish)
+    with get_metrics().stage("preprocess", parish=parish.name), profile_stage(
+        f"preprocess-{parish.name}", profile
+    ):
+        df_clean = build_schedule(*source)
+        partitions, unmatched = partition_by_role(df_clean, parish.roles, rosters)
+    report_unmatched(parish.roles, unmatched)
+    return rosters, df_clean, partitions
 
-def read_last_log(client, spreadsheet_id: str, id: str, platform: str) -> dict | None:
+
+def whatsapp_client(args, parish):
     """
-    Return last matching log entry based on chat_id AND platform.
-    If no match found, return None. If sheet not found, create and return None.
+    The WhatsApp client of one parish run, shared by the status check and the
+    sends (a no-op context for dry runs and parishes not sending on WhatsApp).
     """
-    SHEET_NAME = "Notification Chat Log"
+    from contextlib import nullcontext
 
-    try:
-        sheet = client.open_by_key(spreadsheet_id).worksheet(SHEET_NAME)
-        records = sheet.get_all_records()
-
-        # Search from bottom to get the latest entry
-        for row in reversed(records):
-            if is_number_match(
-                row.get("Chat Id / Whatsapp No", ""), id, platform
-            ) and str(row.get("Platform", "")).strip().lower() == platform.strip().lower():
-                return row
-
-        return None
-
-    except WorksheetNotFound:
-        # Sheet doesn't exist → create new one
-        sheet = client.open_by_key(spreadsheet_id).add_worksheet(
-            title=SHEET_NAME, rows="10", cols="7"
-        )
-        sheet.append_row(
-            [
-                "Timestamp",
-                "Name",
-                "Chat Id / Whatsapp No",
-                "Message Preview",
-                "Schedule Hash",
-                "Status",
-                "Platform",
-            ]
-        )
-        return None
-
-
-def update_log(
-    client,
-    spreadsheet_id: str,
-    name: str,
-    id: str,
-    preview: str,
-    hash_value: str,
-    status: str,
-    platform: str,
-) -> None:
-    """Update or insert log entry ensuring only one record exists per id and platform."""
-    SHEET_NAME = "Notification Chat Log"
+    if args.dry_run or not parish.sends_whatsapp:
+        return nullcontext()
+    from utils.whatsapp_bot import AsyncWhatsAppBot
 
-    try:
-        sheet = client.open_by_key(spreadsheet_id).worksheet(SHEET_NAME)
-    except WorksheetNotFound:
-        sheet = client.open_by_key(spreadsheet_id).add_worksheet(
-            title=SHEET_NAME, rows="10", cols="7"
-        )
-        sheet.append_row(
-            [
-                "Timestamp",
-                "Name",
-                "Chat Id / Whatsapp No",
-                "Message Preview",
-                "Schedule Hash",
-                "Status",
-                "Platform",
-            ]
-        )
+    return AsyncWhatsAppBot()
 
-    records = sheet.get_all_records()
-    timestamp = datetime.now(ZoneInfo("Asia/Jakarta")).strftime("%Y-%m-%d %H:%M:%S")
-
-    # Search existing row
-    for idx, row in enumerate(records, start=2):
-        if is_number_match(
-            row.get("Chat Id / Whatsapp No"), id, platform
-        ) and str(row.get("Platform")).strip().lower() == platform.strip().lower():
-            sheet.update(
-                range_name=f"A{idx}:G{idx}",
-                values=[
-                    [timestamp, name, id if platform == "telegram" else normalize_number(id), preview, hash_value, status, platform]
-                ],
-            )
-            return
-
-    # Insert new row if none found
-    sheet.append_row(
-        [
-            timestamp,
-            name,
-            id if platform == "telegram" else normalize_number(id),
-            preview,
-            hash_value,
-            status,
-            platform,
-        ]
-    )
 
+async def halt_on_whatsapp_error(dry_run: bool, admin_chat_ids, whatsAppBot=None) -> bool:
+    """Check WhatsApp (over `whatsAppBot` if given); on failure alert the admins and return False."""
+    from pipeline.status import check_whatsapp_status, send_admin_alert
 
-def save_df_to_gsheet(spreadsheet, worksheet_output_name: str, df: pd.DataFrame) -> None:
-    """Save a DataFrame to a specific Google Sheets worksheet."""
-    try:
-        sheet_out = spreadsheet.worksheet(worksheet_output_name)
-    except WorksheetNotFound:
-        sheet_out = spreadsheet.add_worksheet(
-            title=worksheet_output_name,
-            rows=str(len(df) + 10),
-            cols=str(len(df.columns) + 5),
-        )
+    error_msg = await check_whatsapp_status(whatsAppBot)
+    if error_msg is None:
+        return True
+    print(f"WhatsApp API is unavailable: {error_msg}")
+    if not dry_run:
+        for chat_id in dict.fromkeys(admin_chat_ids):
+            await send_admin_alert(error_msg, chat_id)
+    print("System halted.")
+    return False
 
-    sheet_out.clear()
-    data = [df.columns.tolist()] + df.astype(str).values.tolist()
 
-    tz = timezone("Asia/Jakarta")
-    last_update_str = (
-        f"Last Update: {datetime.now(tz).strftime('%d-%b-%Y %H:%M:%S WIB')}"
+async def for_each_parish(args, stage) -> int:
+    """
+    Run `stage(args, client, parish)` for every configured parish concurrently,
+    sharing one client (and its scheduler). A failing parish is reported and
+    does not stop the others; the exit code is non-zero if any failed.
+    """
+    from utils.dispatcher import default_buckets
+
+    client = connect(args)
+    # One set of send rate limits shared by every parish
+    args.buckets = default_buckets()
+    parishes = args.parish_configs
+    results = await asyncio.gather(
+        *(stage(args, client, parish) for parish in parishes), return_exceptions=True
     )
-    today = datetime.today()
-    url = f"https://www.imankatolik.or.id/kalender.php?b={today.month}&t={today.year}"
 
-    requests = [
-        {"range": f"A1:{chr(65 + len(df.columns) - 1)}{len(df) + 1}", "values": data},
-        {"range": "K1", "values": [[last_update_str]]},
-        {"range": "K2", "values": [["Liturgical Calendar:"]]},
-        {"range": "L2", "values": [[url]]},
-    ]
-    sheet_out.batch_update(requests)
-    print(f"✅ Saved to Google Sheet: {worksheet_output_name}", flush=True)
+    exit_code = 0
+    for parish, result in zip(parishes, results):
+        if isinstance(result, BaseException):
+            print(f"❌ [{parish.name}] {type(result).__name__}: {result}", flush=True)
+            exit_code = 1
+        elif result:
+            exit_code = result
+    return exit_code
 
 
 # =======================================
-# 2. GOOGLE SHEETS CONNECTION
+# 2. SUBCOMMANDS
 # =======================================
-SPREADSHEET_ID = "1xMNjbpQJhh8jTOaNlxPWy9B2nTEMBAURR9Ys3O90jlM"
-WORKSHEET_NAME = "Jadwal Pasdior"
-SPREADSHEET_ID_OUTPUT = "1nqY5jNzJvsy7v37jnb-rlSDUNvsLYiuHq5-ryAW1Kxs"
-WORKSHEET_OUTPUT = "jadwal"
-ORGANIST_WORKSHEET_NAME = "Data Organis"
-
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive",
-]
-creds = get_google_credentials(scope)
-client = gspread.authorize(creds)
+async def cmd_status(args) -> int:
+    """Only check the WhatsApp API (no Google Sheets, no pandas)."""
+    admin_chat_ids = [parish.admin_chat_id for parish in args.parish_configs]
+    return 0 if await halt_on_whatsapp_error(args.dry_run, admin_chat_ids) else 1
 
-# =======================================
-# 3. LOAD ORGANIST LIST
-# =======================================
-organist_sheet = client.open_by_key(SPREADSHEET_ID_OUTPUT).worksheet(
-    ORGANIST_WORKSHEET_NAME
-)
-all_organist_data = organist_sheet.get_all_values()
-
-organist_records = []
-for row in all_organist_data[1:]:
-    if not row or not row[0].strip():
-        continue
-    name = row[0].strip()
-    chat_id = row[1].strip() if len(row) > 1 and row[1].strip() else None
-    wa_number = row[2].strip() if len(row) > 2 and row[2].strip() else None
-    organist_records.append({"name": name, "chat_id": chat_id, "wa_number": wa_number})
-
-clean_organist_list_name = [r["name"].lower() for r in organist_records]
 
-# =======================================
-# 4. LOAD & PREPROCESS DATA
-# =======================================
-sheet = client.open_by_key(SPREADSHEET_ID).worksheet(WORKSHEET_NAME)
-all_data = sheet.get_all_values()
-
-# Extract main data columns
-data = [row[1:11] for row in all_data[4:] if len(row) >= 11]
-df = pd.DataFrame(data, columns=["B", "C", "D", "E", "F", "G", "H", "I", "J", "K"]).copy()
-
-# Override columns F,G if J,K are filled
-mask_j = df["J"].astype(str).str.strip() != ""
-df.loc[mask_j, ["F", "G"]] = df.loc[mask_j, ["J", "K"]].values
-# cleaning unused field
-df = df[["B", "C", "D", "E", "F", "G"]]
-
-
-target_date = datetime(datetime.now().year, 12, 25)
-today = datetime.now()
-if today < target_date:
-    # Extract extra data (second schedule section)
-    data_extra = [row[14:18] for row in all_data[4:982] if len(row) >= 18]
-    df_extra = pd.DataFrame(data_extra, columns=["O", "P", "Q", "R"])
-    df_extra["B"], df_extra["C"], df_extra["F"], df_extra["G"] = df_extra["O"], df_extra["P"], df_extra["Q"], df_extra["R"]
-    df_extra["D"], df_extra["E"] = "", ""
-    df_extra = df_extra[["B", "C", "D", "E", "F", "G"]]
-
-    # Merge both sections
-    df_all = pd.concat([df, df_extra], ignore_index=True)
-else:
-    df_all = df
-
-
-# Convert dates
-month_map = {
-    "Jan": "01",
-    "Feb": "02",
-    "Mar": "03",
-    "Apr": "04",
-    "May": "05",
-    "Jun": "06",
-    "Jul": "07",
-    "Aug": "08",
-    "Sep": "09",
-    "Sept": "09",
-    "Oct": "10",
-    "Nov": "11",
-    "Dec": "12",
-}
-b_str = df_all["B"].astype(str).str.strip().replace(month_map, regex=True)
-b_dt = pd.to_datetime(b_str, dayfirst=True, errors="coerce")
-
-# Handle Excel serial date format
-serial_mask = b_str.str.match(r"^\d{4,6}$", na=False)
-b_dt.loc[serial_mask] = pd.to_datetime("1899-12-30") + pd.to_timedelta(
-    b_str.loc[serial_mask].astype(int), unit="D"
-)
-
-df_all["B_dt"] = b_dt
-today_jkt = datetime.now(ZoneInfo("Asia/Jakarta")).date()
-df_all = (
-    df_all[df_all["B_dt"].dt.date >= today_jkt]
-    .copy()
-    .sort_values("B_dt")
-    .reset_index(drop=True)
-)
-
-# Clean and standardize columns
-df_clean = df_all[["B", "C", "D", "E", "F", "G", "B_dt"]].copy()
-df_clean.columns = [
-    "Tanggal",
-    "Jam",
-    "Anamnesis",
-    "Cara Tobat",
-    "Koor",
-    "Organis",
-    "tgl-format",
-]
-df_clean["Tahun Liturgi"] = df_clean["tgl-format"].apply(liturgical_year)
-
-# Format day name (Indonesian)
-df_clean["Hari"] = df_clean["tgl-format"].apply(
-    lambda d: format_date(d, "EEEE", locale="id") if pd.notnull(d) else ""
-)
-df_clean["Weekday"] = df_clean["Hari"].apply(
-    lambda x: "yes" if x not in ["Sabtu", "Minggu", "Saturday", "Sunday"] else "no"
-)
+async def sync_tabs(args, client, parish) -> int:
+    from pipeline.publish import publish_tabs
 
-# =======================================
-# 5. TELEGRAM REMINDER SENDER
-# =======================================
-spreadsheet = client.open_by_key(SPREADSHEET_ID_OUTPUT)
-
-
-async def send_notifications_reminders():
-    print("🚀 Starting reminder process...\n", flush=True)
-
-    for rec in organist_records:
-        name, chat_id, wa_number = rec["name"], rec["chat_id"], rec["wa_number"]
-        print(f"🔹 Processing {name}...", flush=True)
-
-        # Filter schedule
-        filter_df = df_clean[df_clean["Organis"].str.lower() == name.lower()].copy()
-
-        # Drop the 'tgl-format' column before saving
-        df_to_save = filter_df.drop(columns=["tgl-format"])
-
-        # Reorder the table
-        new_order = [
-            "Hari",
-            "Tanggal",
-            "Jam",
-            "Anamnesis",
-            "Cara Tobat",
-            "Koor",
-            "Organis",
-            "Tahun Liturgi",
-            "Weekday",
-        ]
-        df_to_save = df_to_save[new_order]
-
-        await asyncio.to_thread(
-            save_df_to_gsheet, spreadsheet, f"Jadwal {name.capitalize()}", df_to_save
+    rosters, _, partitions = await asyncio.to_thread(
+        load_and_preprocess, client, parish, args.profile
+    )
+    spreadsheet = await asyncio.to_thread(client.open_by_key, parish.spreadsheet_id_output)
+    await asyncio.to_thread(
+        publish_tabs, spreadsheet, parish.roles, rosters, partitions, args.dry_run, parish.name
+    )
+    return 0
+
+
+async def cmd_sync_tabs(args) -> int:
+    """Rebuild every "Jadwal <Name>" tab, for every role."""
+    return await for_each_parish(args, sync_tabs)
+
+
+async def notify(args, client, parish) -> int:
+    from pipeline.notify import send_notifications_reminders
+
+    if not parish.notify:
+        return 0
+    async with whatsapp_client(args, parish) as whatsAppBot:
+        # Per parish, so a WhatsApp outage does not hold back Telegram-only parishes
+        if whatsAppBot and not await halt_on_whatsapp_error(
+            args.dry_run, [parish.admin_chat_id], whatsAppBot
+        ):
+            return 1
+        rosters, _, partitions = await asyncio.to_thread(
+            load_and_preprocess, client, parish, args.profile
+        )
+        spreadsheet = await asyncio.to_thread(client.open_by_key, parish.spreadsheet_id_output)
+        await send_notifications_reminders(
+            spreadsheet,
+            rosters,
+            partitions,
+            args.dry_run,
+            whatsAppBot,
+            parish=parish,
+            buckets=args.buckets,
+        )
+    return 0
+
+
+async def cmd_notify(args) -> int:
+    """Send reminders (parishes sending on WhatsApp require a connected WhatsApp API)."""
+    return await for_each_parish(args, notify)
+
+
+async def drain_outbox(args, client, parish) -> int:
+    """Send reminders left in the outbox by an earlier (throttled or failed) run."""
+    from pipeline.config import OUTBOX_RETRY_WINDOW
+    from pipeline.notify import has_pending_reminders, retry_outbox
+
+    if not parish.notify or args.dry_run or not await asyncio.to_thread(
+        has_pending_reminders, parish
+    ):
+        return 0
+    async with whatsapp_client(args, parish) as whatsAppBot:
+        if whatsAppBot and not await halt_on_whatsapp_error(
+            args.dry_run, [parish.admin_chat_id], whatsAppBot
+        ):
+            return 1
+        spreadsheet = await asyncio.to_thread(client.open_by_key, parish.spreadsheet_id_output)
+        await retry_outbox(
+            spreadsheet,
+            whatsAppBot,
+            parish=parish,
+            buckets=args.buckets,
+            retry_window=OUTBOX_RETRY_WINDOW,
+        )
+    return 0
+
+
+async def run(args, client, parish) -> int:
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+
+    from pipeline.config import TIMEZONE
+    from utils.change_detection import ChangeDetector, default_state_path
+
+    # Change detection (before any heavy work)
+    change_detector = ChangeDetector(
+        client,
+        [parish.spreadsheet_id, parish.spreadsheet_id_output],
+        state_path=parish.scoped_path(default_state_path()),
+        written_ids=[parish.spreadsheet_id_output],
+    )
+    today = datetime.now(ZoneInfo(TIMEZONE)).date()
+    # Also taken with --force: the fingerprints seen before loading are the ones committed
+    unchanged = await asyncio.to_thread(change_detector.is_unchanged, today)
+    if not args.force and unchanged:
+        print(
+            f"✅ [{parish.name}] Nothing changed since the last run. Use --force to run anyway.",
+            flush=True,
         )
+        return await drain_outbox(args, client, parish)
 
-        # Send notifications if schedule exists
-        if not filter_df.empty:
-            next_three = filter_df.head(3).copy()
-            next_three["Tanggal_dt"] = next_three["tgl-format"]
-
-            tanggal_list = []
-            for _, row in next_three.iterrows():
-                if pd.notnull(row["Tanggal_dt"]):
-                    hari = format_date(row["Tanggal_dt"], "EEEE", locale="id")
-                    tanggal = format_date(row["Tanggal_dt"], "d MMMM y", locale="id")
-                    jam = str(row["Jam"]).strip() if pd.notnull(row["Jam"]) else ""
-                    koor = str(row["Koor"]).strip() if pd.notnull(row["Koor"]) else "-"
-                    tanggal_list.append(f"- {hari}, {tanggal} • {jam} (Koor: {koor})")
-
-            reminder_text = (
-                f"Hi {name.capitalize()}, jadwal organis berikutnya adalah:\n"
-                + "\n".join(tanggal_list)
-                + "\n\nUntuk jadwal yang lebih update silahkan cek di link berikut:\nhttps://linktr.ee/pasdiormabes"
+    from pipeline.notify import send_notifications_reminders
+    from pipeline.preprocess import output_valid_through
+    from pipeline.publish import publish_tabs
+
+    rosters, df_clean, partitions = await asyncio.to_thread(
+        load_and_preprocess, client, parish, args.profile
+    )
+    spreadsheet = await asyncio.to_thread(client.open_by_key, parish.spreadsheet_id_output)
+    await asyncio.to_thread(
+        publish_tabs, spreadsheet, parish.roles, rosters, partitions, args.dry_run, parish.name
+    )
+
+    if parish.notify:
+        async with whatsapp_client(args, parish) as whatsAppBot:
+            if whatsAppBot and not await halt_on_whatsapp_error(
+                args.dry_run, [parish.admin_chat_id], whatsAppBot
+            ):
+                return 1
+
+            print(f"Starting notifications for {parish.name}...")
+            await send_notifications_reminders(
+                spreadsheet,
+                rosters,
+                partitions,
+                args.dry_run,
+                whatsAppBot,
+                parish=parish,
+                buckets=args.buckets,
             )
 
-            print(reminder_text, flush=True)
-            print("=" * 60, flush=True)
+    if not args.dry_run:
+        await asyncio.to_thread(change_detector.commit, output_valid_through(df_clean))
+    return 0
 
-            # Create schedule hash based on dates & times
-            hash_value = "|".join(tanggal_list)
 
-            # Notification by WhatsApp
-            if wa_number:
-                previous_log = read_last_log(
-                    client, SPREADSHEET_ID_OUTPUT, id=wa_number, platform="whatsapp"
-                )
+async def cmd_run(args) -> int:
+    """Full daily run: change detection, tabs, WhatsApp check, reminders."""
+    return await for_each_parish(args, run)
 
-                if previous_log and previous_log.get("Schedule Hash") == hash_value:
-                    # Same schedule → skip sending
-                    print(f"⏭ SKIPPED (duplicate schedule): {name}", flush=True)
-                    update_log(
-                        client,
-                        SPREADSHEET_ID_OUTPUT,
-                        name,
-                        id=wa_number,
-                        preview=reminder_text[:100],
-                        hash_value=hash_value,
-                        status="skipped",
-                        platform="whatsapp",
-                    )
-                else:
-                    try:
-                        whatsAppBot = WhatsAppBot()
-                        whatsAppBot.send(wa_number, reminder_text)
-                        print(
-                            f"📨 Whatsapp Reminder sent to {name} ({wa_number})",
-                            flush=True,
-                        )
-                        update_log(
-                            client,
-                            SPREADSHEET_ID_OUTPUT,
-                            name,
-                            id=wa_number,
-                            preview=reminder_text[:100],
-                            hash_value=hash_value,
-                            status="sent",
-                            platform="whatsapp",
-                        )
-                    except Exception as e:
-                        print(f"⚠️ Failed to send Whatsapp to {name}: {e}", flush=True)
-                        update_log(
-                            client,
-                            SPREADSHEET_ID_OUTPUT,
-                            name,
-                            id=wa_number,
-                            preview=reminder_text[:100],
-                            hash_value=hash_value,
-                            status=f"error: {e}",
-                            platform="whatsapp",
-                        )
-
-            # Notification by Telegram
-            if chat_id:
-                previous_log = read_last_log(
-                    client, SPREADSHEET_ID_OUTPUT, id=chat_id, platform="telegram"
+
+async def cmd_serve(args) -> int:
+    """Stay running: daily full run plus change polling, with warm clients."""
+    from pipeline.schedule_index import ScheduleIndex
+    from pipeline.serve import ScheduleDaemon, parse_daily_at
+    from utils.dispatcher import default_buckets
+
+    client = connect(args)
+    args.buckets = default_buckets()
+    daemons = []
+    for parish in args.parish_configs:
+        # A parish that cannot be set up is reported and left out; the others keep serving
+        try:
+            daemons.append(
+                ScheduleDaemon(
+                    client,
+                    daily_at=parse_daily_at(args.daily_at),
+                    poll_seconds=args.poll_seconds,
+                    dry_run=args.dry_run,
+                    parish=parish,
+                    buckets=args.buckets,
+                    index=(
+                        ScheduleIndex(role.column for role in parish.roles)
+                        if args.telegram_commands
+                        else None
+                    ),
                 )
+            )
+        except Exception as e:
+            print(f"❌ [{parish.name}] {type(e).__name__}: {e}", flush=True)
+    if not daemons:
+        return 1
 
-                if previous_log and previous_log.get("Schedule Hash") == hash_value:
-                    # Same schedule → skip sending
-                    print(f"⏭ SKIPPED (duplicate schedule): {name}", flush=True)
-                    update_log(
-                        client,
-                        SPREADSHEET_ID_OUTPUT,
-                        name,
-                        id=chat_id,
-                        preview=reminder_text[:100],
-                        hash_value=hash_value,
-                        status="skipped",
-                        platform="telegram",
-                    )
-                else:
-                    try:
-                        telegramBot = TelegramBot(chat_id=chat_id)
-                        await telegramBot.send(reminder_text)
-                        print(f"📨 Reminder sent to {name} ({chat_id})", flush=True)
-                        update_log(
-                            client,
-                            SPREADSHEET_ID_OUTPUT,
-                            name,
-                            id=chat_id,
-                            preview=reminder_text[:100],
-                            hash_value=hash_value,
-                            status="sent",
-                            platform="telegram",
-                        )
-                    except Exception as e:
-                        print(f"⚠️ Failed to send Telegram to {name}: {e}", flush=True)
-                        update_log(
-                            client,
-                            SPREADSHEET_ID_OUTPUT,
-                            name,
-                            id=chat_id,
-                            preview=reminder_text[:100],
-                            hash_value=hash_value,
-                            status=f"error: {e}",
-                            platform="telegram",
-                        )
-        await asyncio.sleep(random.uniform(6, 15))
-
-    print("\n✅ All reminders processed!", flush=True)
-
-async def check_and_run():
-    whatsAppBot = WhatsAppBot()
-    admin_chat_id = "1731149425"
-    
-    print("Checking WhatsApp connection status...")
-    
-    error_msg = None
-    try:
-        status = whatsAppBot.get_status()
-        
-        # Check if the 'connected' field is True
-        if status.get("connected") is True:
-            print("WhatsApp READY. Starting notifications...")
-            # Proceed to the main function
-            await send_notifications_reminders()
-            return 
-        else:
-            # Capture specific status from API if not connected
-            error_msg = status.get('whatsapp_status', 'NOT CONNECTED')
-            print(f"WhatsApp status is: {error_msg}")
-
-    except (WhatsAppNetworkError, WhatsAppAPIError) as e:
-        error_msg = str(e)
-    except Exception as e:
-        error_msg = f"Unexpected Error: {str(e)}"
-
-    # If error_msg exists, send Telegram alert and stop execution
-    if error_msg:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M UTC")
-        reminder_text = (
-            f"[{timestamp}]\n\n"
-            f"WhatsApp API is unavailable.\n\n"
-            f"Error:\n\"{error_msg}\""
-        )
-        
-        print("Sending alert to Telegram...")
+    async def supervise(name: str, coro) -> int:
+        """Await one serve task; a crash is reported at once and does not stop the others."""
         try:
-            telegramBot = TelegramBot(chat_id=admin_chat_id)
-            await telegramBot.send(reminder_text)
-            print("Telegram alert sent.")
-        except Exception as tel_err:
-            print(f"Failed to send Telegram: {tel_err}")
-        
-        print("System halted.")
-        
-        # SAFE EXIT LOGIC:
-        # Check if running in Jupyter (ipykernel) or standard Python
-        if 'ipykernel' in sys.modules:
-            # In Jupyter, return quietly to avoid messy red error boxes
-            return 
-        else:
-            # In a .py script, exit with status 1 for system signaling
-            sys.exit(1)
+            await coro
+        except Exception as e:
+            print(f"❌ [{name}] {type(e).__name__}: {e}", flush=True)
+            return 1
+        return 0
+
+    tasks = [supervise(daemon.parish.name, daemon.serve_forever()) for daemon in daemons]
+    if args.telegram_commands:
+        from pipeline.telegram_commands import ScheduleCommands
+
+        commands = ScheduleCommands([(d.parish, d.index) for d in daemons])
+        tasks.append(supervise("telegram-commands", commands.run()))
+    results = await asyncio.gather(*tasks)
+    return 1 if any(results) or len(daemons) < len(args.parish_configs) else 0
+
+
+async def cmd_outbox(args) -> int:
+    """Show the reminder outbox per parish; list or requeue dead-lettered reminders."""
+    from datetime import datetime
+
+    from utils.notification_store import default_db_path
+    from utils.outbox import NotificationOutbox
+
+    for parish in args.parish_configs:
+        with NotificationOutbox(parish.scoped_path(default_db_path())) as outbox:
+            print(f"📬 [{parish.name}] Outbox: {outbox.counts() or 'empty'}", flush=True)
+            if args.list_dead:
+                for job in outbox.dead_letters():
+                    updated = datetime.fromtimestamp(job["updated_at"]).strftime("%Y-%m-%d %H:%M")
+                    print(
+                        f"☠️ {updated} {job['platform']} to {job['name']} ({job['recipient']}), "
+                        f"{job['attempts']} attempts: {job['last_error']}",
+                        flush=True,
+                    )
+            if args.requeue and not args.dry_run:
+                count = outbox.requeue_dead()
+                print(f"🔁 [{parish.name}] Requeued {count} dead-lettered reminder(s)", flush=True)
+    return 0
+
+
+COMMANDS = {
+    "run": cmd_run,
+    "sync-tabs": cmd_sync_tabs,
+    "notify": cmd_notify,
+    "status": cmd_status,
+    "serve": cmd_serve,
+    "outbox": cmd_outbox,
+}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate organist schedule tabs and send reminders."
+    )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="run",
+        choices=COMMANDS,
+        help="run (default): everything; sync-tabs: only the tabs; "
+        "notify: only reminders; status: only check WhatsApp; "
+        "serve: keep running on a schedule; outbox: inspect the reminder outbox",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="read everything but do not write sheets or send messages",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        default=os.getenv("FORCE_RUN") == "1",
+        help="run even if the spreadsheets have not changed (or FORCE_RUN=1)",
+    )
+    parser.add_argument(
+        "--fake-sheets",
+        metavar="JSON",
+        help="run offline against an in-memory Google Sheets fake seeded from JSON "
+        "(see fixtures/offline_sheets.json) and report the API calls made",
+    )
+    parser.add_argument(
+        "--max-api-calls",
+        type=int,
+        metavar="N",
+        help="with --fake-sheets: exit with status 2 if the run made more than N calls",
+    )
+    parser.add_argument(
+        "--daily-at",
+        metavar="HH:MM",
+        default=os.getenv("SERVE_DAILY_AT"),
+        help="serve: time of the daily full run, Asia/Jakarta (or SERVE_DAILY_AT)",
+    )
+    parser.add_argument(
+        "--poll-seconds",
+        type=float,
+        metavar="N",
+        default=os.getenv("SERVE_POLL_SECONDS"),
+        help="serve: seconds between change polls (or SERVE_POLL_SECONDS)",
+    )
+    parser.add_argument(
+        "--list-dead",
+        action="store_true",
+        help="outbox: list dead-lettered reminders with their last error",
+    )
+    parser.add_argument(
+        "--requeue",
+        action="store_true",
+        help="outbox: give dead-lettered reminders a fresh set of attempts "
+        "(sent by the next run or serve poll)",
+    )
+    parser.add_argument(
+        "--telegram-commands",
+        action="store_true",
+        default=os.getenv("SERVE_TELEGRAM_COMMANDS") == "1",
+        help="serve: answer /jadwal and /koor on the Telegram bot from an in-memory "
+        "schedule index (or SERVE_TELEGRAM_COMMANDS=1)",
+    )
+    parser.add_argument(
+        "--parishes",
+        metavar="JSON",
+        default=os.getenv("PARISHES_CONFIG"),
+        help="process every parish in this config file in parallel "
+        "(see parishes.example.json; or PARISHES_CONFIG)",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="PATH",
+        default=os.getenv("METRICS_JSON_PATH", str(PROJECT_ROOT / ".cache" / "metrics.json")),
+        help="write a JSON summary of stage timings and API counters here "
+        "(or METRICS_JSON_PATH; empty to disable)",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="PATH",
+        default=os.getenv("METRICS_TEXTFILE_PATH", str(PROJECT_ROOT / ".cache" / "metrics.prom")),
+        help="write the same metrics for the Prometheus textfile collector "
+        "(or METRICS_TEXTFILE_PATH; empty to disable)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the preprocessing stage with cProfile and tracemalloc",
+    )
+    args = parser.parse_args(argv)
+
+    # Defaults live in pipeline.config, imported lazily to keep startup light
+    from pipeline.config import SERVE_DAILY_AT, SERVE_POLL_SECONDS, load_parishes
+
+    args.parish_configs = load_parishes(args.parishes)
+    if args.command == "serve":
+        args.daily_at = args.daily_at or SERVE_DAILY_AT
+        args.poll_seconds = float(args.poll_seconds or SERVE_POLL_SECONDS)
+    return args
 
 
 # =======================================
-# 6. RUN MAIN FUNCTION
+# 3. RUN MAIN FUNCTION
 # =======================================
-if __name__ == "__main__":   
-    nest_asyncio.apply()
-    asyncio.run(check_and_run())
\ No newline at end of file
+async def main(argv: list[str] | None = None) -> int:
+    from dotenv import find_dotenv, load_dotenv
+
+    load_dotenv(find_dotenv())
+    args = parse_args(argv)
+    from utils.metrics import get_metrics
+
+    get_metrics().configure(args.metrics_json, args.metrics_textfile)
+    try:
+        exit_code = await COMMANDS[args.command](args)
+        return exit_code or report_api_calls(args)
+    finally:
+        get_metrics().flush()
+        # Close the shared Telegram connection pool if it was used
+        if "utils.telegram_bot" in sys.modules:
+            from utils.telegram_bot import shutdown_telegram_sender
+
+            await shutdown_telegram_sender()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
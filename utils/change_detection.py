@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+from gspread.urls import DRIVE_FILES_API_V3_URL
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_STATE_PATH = PROJECT_ROOT / ".cache" / "run_state.json"
+
+
+def default_state_path() -> Path:
+    """RUN_STATE_PATH, or `.cache/run_state.json` in the project."""
+    return Path(os.getenv("RUN_STATE_PATH") or DEFAULT_STATE_PATH)
+
+
+def get_drive_fingerprint(client, file_id: str) -> dict:
+    """Fetch a spreadsheet's Drive `modifiedTime` and `version` (one small Drive API call)."""
+    response = client.http_client.request(
+        "get",
+        f"{DRIVE_FILES_API_V3_URL}/{file_id}",
+        params={"supportsAllDrives": True, "fields": "modifiedTime,version"},
+    )
+    metadata = response.json()
+    return {"modifiedTime": metadata.get("modifiedTime"), "version": metadata.get("version")}
+
+
+class ChangeDetector:
+    """
+    Decide whether a run can be skipped because nothing changed since the last one.
+
+    The fingerprint of every watched spreadsheet (Drive version + modifiedTime)
+    is persisted locally after a successful run, together with `valid_through`:
+    the last day on which the published output is still correct (the next
+    scheduled date drops off after it). A run is skipped only when every
+    fingerprint matches and today is not past `valid_through`.
+
+    `written_ids` are the spreadsheets the run writes itself (the output):
+    their fingerprints are re-read at commit time. The others keep the
+    fingerprint taken before the run, so an edit made during it is not
+    recorded as seen.
+    """
+
+    def __init__(
+        self,
+        client,
+        spreadsheet_ids: list[str],
+        state_path: str | Path | None = None,
+        written_ids: list[str] = (),
+    ):
+        self.client = client
+        self.spreadsheet_ids = spreadsheet_ids
+        self.written_ids = list(written_ids)
+        self.state_path = Path(state_path or default_state_path())
+        self._seen: dict | None = None
+
+    def _load_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def current_fingerprints(self) -> dict:
+        """Fetch every fingerprint; remembered as the state the next `commit()` saves."""
+        self._seen = {
+            file_id: get_drive_fingerprint(self.client, file_id)
+            for file_id in self.spreadsheet_ids
+        }
+        return self._seen
+
+    def is_unchanged(self, today: date) -> bool:
+        """Return True if every spreadsheet is unchanged and the last output is still valid."""
+        state = self._load_state()
+        # Always fetched: they are what `commit()` saves for the source spreadsheets
+        fingerprints = self.current_fingerprints()
+        valid_through = state.get("valid_through")
+        if not valid_through or today > date.fromisoformat(valid_through):
+            return False
+        return state.get("fingerprints") == fingerprints
+
+    def commit(self, valid_through: date) -> None:
+        """
+        Persist fingerprints after a successful run.
+
+        The fingerprints taken before the run (by `is_unchanged()` /
+        `current_fingerprints()`) are saved, except for `written_ids`, which
+        are fetched again on purpose: our own writes to the output
+        spreadsheet bump its version, and that must not look like an edit.
+        """
+        fingerprints = dict(self._seen) if self._seen is not None else self.current_fingerprints()
+        for file_id in self.written_ids:
+            fingerprints[file_id] = get_drive_fingerprint(self.client, file_id)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        state = {
+            "fingerprints": fingerprints,
+            "valid_through": valid_through.isoformat(),
+        }
+        self.state_path.write_text(json.dumps(state, indent=2))
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from utils.metrics import get_metrics
+from utils.rate_limit import TokenBucket
+
+
+@dataclass
+class NotificationJob:
+    """A single reminder to deliver on one platform; `key` is its outbox idempotency key."""
+
+    platform: str
+    recipient: str
+    text: str
+    name: str = ""
+    hash_value: str = ""
+    key: str = ""
+
+
+@dataclass
+class DispatchResult:
+    """Outcome of a NotificationJob: `error` is None when the send succeeded."""
+
+    job: NotificationJob
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+Sender = Callable[[NotificationJob], Awaitable[object]]
+
+
+def default_buckets() -> dict[str, TokenBucket]:
+    """
+    Per-platform limits.
+
+    WhatsApp (Baileys): one message every 6–15s, the same conservative, jittered
+    pace the old loop used, but only applied when something is actually sent.
+    Telegram needs no bucket here: TelegramSender's AIORateLimiter already
+    enforces Telegram's documented limits.
+    """
+    return {
+        "whatsapp": TokenBucket(rate=1 / 6, capacity=1, jitter=9.0),
+    }
+
+
+# Telegram matches TelegramSender's connection pool size
+DEFAULT_CONCURRENCY = {"whatsapp": 1, "telegram": 16}
+
+
+class NotificationDispatcher:
+    """
+    Send NotificationJobs concurrently within per-platform rate limits.
+
+    Each platform has its own TokenBucket and a bounded number of in-flight
+    sends; platforms run independently of each other.
+    """
+
+    def __init__(
+        self,
+        senders: dict[str, Sender],
+        buckets: dict[str, TokenBucket] | None = None,
+        concurrency: dict[str, int] | None = None,
+    ):
+        self.senders = senders
+        self.buckets = buckets if buckets is not None else default_buckets()
+        concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self._semaphores = {
+            platform: asyncio.Semaphore(concurrency.get(platform, 1))
+            for platform in senders
+        }
+
+    async def _run(self, job: NotificationJob) -> DispatchResult:
+        sender = self.senders.get(job.platform)
+        if sender is None:
+            return DispatchResult(job, f"no sender configured for {job.platform}")
+
+        metrics = get_metrics()
+        async with self._semaphores[job.platform]:
+            if bucket := self.buckets.get(job.platform):
+                start = time.perf_counter()
+                await bucket.acquire()
+                metrics.count(
+                    "rate_limit_wait_seconds", time.perf_counter() - start, platform=job.platform
+                )
+            try:
+                with metrics.stage("send", platform=job.platform):
+                    await sender(job)
+            except Exception as e:
+                metrics.count("messages", platform=job.platform, status="error")
+                return DispatchResult(job, str(e))
+        metrics.count("messages", platform=job.platform, status="sent")
+        return DispatchResult(job)
+
+    async def dispatch(self, jobs: list[NotificationJob]) -> list[DispatchResult]:
+        """Send all jobs and return their results in the same order."""
+        return list(await asyncio.gather(*(self._run(job) for job in jobs)))
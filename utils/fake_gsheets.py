@@ -0,0 +1,441 @@
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+
+# =======================================
+# CALL ACCOUNTING
+# =======================================
+@dataclass
+class ApiCall:
+    """One simulated API request. `kind` is "read", "write" or "drive"."""
+
+    kind: str
+    method: str
+    target: str
+    at: float = field(default_factory=time.monotonic)
+
+
+class CallLog:
+    """
+    Every call made against the fake backend.
+
+    Each Sheets HTTP request costs one unit of the per-minute read or write
+    quota, so the counts here are also the quota units a real run would use.
+    """
+
+    def __init__(self):
+        self.calls: list[ApiCall] = []
+
+    def record(self, kind: str, method: str, target: str) -> None:
+        self.calls.append(ApiCall(kind, method, target))
+
+    def count(self, kind: str | None = None) -> int:
+        return sum(1 for call in self.calls if kind is None or call.kind == kind)
+
+    def by_method(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for call in self.calls:
+            counts[call.method] = counts.get(call.method, 0) + 1
+        return counts
+
+    def summary(self) -> dict:
+        return {
+            "total": self.count(),
+            "read": self.count("read"),
+            "write": self.count("write"),
+            "drive": self.count("drive"),
+            "by_method": self.by_method(),
+        }
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+
+def _quota_error() -> APIError:
+    """Build the APIError gspread raises on HTTP 429."""
+    response = requests.Response()
+    response.status_code = 429
+    response._content = json.dumps(
+        {
+            "error": {
+                "code": 429,
+                "message": "Quota exceeded for quota metric 'Read requests' (fake)",
+                "status": "RESOURCE_EXHAUSTED",
+            }
+        }
+    ).encode()
+    return APIError(response)
+
+
+# =======================================
+# RANGE HELPERS
+# =======================================
+A1_PATTERN = re.compile(r"[A-Z]+\d*(:[A-Z]+\d*)?|\d+:\d+")
+
+
+def _split_range(range_name: str) -> tuple[str | None, str | None]:
+    """Split "'Sheet'!A1:B2" into ("Sheet", "A1:B2"); "'Sheet'" into ("Sheet", None)."""
+    if "!" in range_name:
+        title, a1 = range_name.rsplit("!", 1)
+    elif A1_PATTERN.fullmatch(range_name):
+        return None, range_name
+    else:
+        title, a1 = range_name, None
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title, a1
+
+
+def _unformatted(kwargs: dict) -> bool:
+    return str(kwargs.get("value_render_option", "")) == "UNFORMATTED_VALUE"
+
+
+def _cell(value, unformatted: bool):
+    """
+    A stored cell as read. A {"value": ..., "formatted": "..."} cell (e.g. a
+    serial date shown as "6 Jan 2030") reads as either part.
+    """
+    if isinstance(value, dict):
+        return value["value"] if unformatted else value["formatted"]
+    return value if unformatted and not isinstance(value, str) else str(value)
+
+
+# =======================================
+# FAKE GSPREAD OBJECTS
+# =======================================
+class FakeWorksheet:
+    """In-memory stand-in for gspread.Worksheet (values, plus the formatted text of fixture cells that give one)."""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, sheet_id: int,
+                 values: list[list] | None = None, rows: int = 1000, cols: int = 26):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self._values = [list(row) for row in values or []]
+        self.row_count = max(rows, len(self._values))
+        self.col_count = max([cols] + [len(row) for row in self._values])
+
+    def _record(self, kind: str, method: str) -> None:
+        self.spreadsheet._record(kind, method, f"{self.spreadsheet.id}/{self.title}")
+
+    # ----- internal helpers (no accounting) -----
+    def _snapshot(self, unformatted: bool = False) -> list[list]:
+        """Padded grid; strings unless `unformatted` (numbers stay numbers, like UNFORMATTED_VALUE)."""
+        width = max((len(row) for row in self._values), default=0)
+        rows = [
+            [_cell(v, unformatted) for v in row]
+            + [""] * (width - len(row))
+            for row in self._values
+        ]
+        while rows and not any(v != "" for v in rows[-1]):
+            rows.pop()
+        return rows
+
+    def _read_range(self, a1: str | None, unformatted: bool = False) -> list[list]:
+        rows = self._snapshot(unformatted)
+        if not a1:
+            return rows
+        grid = a1_range_to_grid_range(a1)
+        r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(rows))
+        c0 = grid.get("startColumnIndex", 0)
+        c1 = grid.get("endColumnIndex", max((len(row) for row in rows), default=0))
+        out = [row[c0:c1] for row in rows[r0:r1]]
+        while out and not any(v != "" for v in out[-1]):
+            out.pop()
+        return [list(row) for row in out]
+
+    def _write_range(self, a1: str | None, values: list[list]) -> None:
+        grid = a1_range_to_grid_range(a1 or "A1")
+        r0, c0 = grid.get("startRowIndex", 0), grid.get("startColumnIndex", 0)
+        for i, row in enumerate(values):
+            while len(self._values) <= r0 + i:
+                self._values.append([])
+            target = self._values[r0 + i]
+            for j, value in enumerate(row):
+                while len(target) <= c0 + j:
+                    target.append("")
+                target[c0 + j] = "" if value is None else value
+        self.row_count = max(self.row_count, len(self._values))
+        self.col_count = max([self.col_count] + [len(row) for row in self._values])
+
+    def _clear_range(self, a1: str | None) -> None:
+        if not a1:
+            self._values = []
+            return
+        grid = a1_range_to_grid_range(a1)
+        r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(self._values))
+        c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex", self.col_count)
+        for row in self._values[r0:r1]:
+            for j in range(c0, min(c1, len(row))):
+                row[j] = ""
+
+    # ----- gspread surface -----
+    def get_all_values(self, *args, **kwargs) -> list[list[str]]:
+        self._record("read", "get_all_values")
+        return self._snapshot()
+
+    def get_all_records(self, *args, **kwargs) -> list[dict]:
+        """Header row → dicts. Values are kept as strings (no numericise)."""
+        self._record("read", "get_all_records")
+        rows = self._snapshot()
+        if not rows:
+            return []
+        return [dict(zip(rows[0], row)) for row in rows[1:]]
+
+    def get(self, range_name: str | None = None, **kwargs) -> list[list[str]]:
+        self._record("read", "get")
+        return self._read_range(range_name, _unformatted(kwargs))
+
+    def batch_get(self, ranges: list[str], **kwargs) -> list[list[list[str]]]:
+        self._record("read", "batch_get")
+        return [self._read_range(a1, _unformatted(kwargs)) for a1 in ranges]
+
+    def append_row(self, values: list, **kwargs) -> dict:
+        return self.append_rows([values], _method="append_row")
+
+    def append_rows(self, values: list[list], _method: str = "append_rows", **kwargs) -> dict:
+        self._record("write", _method)
+        start = len(self._snapshot()) + 1
+        self._write_range(f"A{start}", values)
+        width = max((len(row) for row in values), default=1)
+        end_col = re.sub(r"\d", "", rowcol_to_a1(1, width))
+        return {
+            "updates": {
+                "updatedRange": f"'{self.title}'!A{start}:{end_col}{start + len(values) - 1}",
+                "updatedRows": len(values),
+            }
+        }
+
+    def update(self, values=None, range_name: str | None = None, **kwargs) -> dict:
+        # Accept both gspread 5 (range, values) and 6 (values, range) orders
+        if isinstance(values, str) and not isinstance(range_name, str):
+            values, range_name = range_name, values
+        self._record("write", "update")
+        self._write_range(range_name, values or [])
+        return {"updatedRange": f"'{self.title}'!{range_name or 'A1'}"}
+
+    def batch_update(self, data: list[dict], **kwargs) -> dict:
+        self._record("write", "batch_update")
+        for item in data:
+            self._write_range(item["range"], item["values"])
+        return {"totalUpdatedCells": sum(len(r) for item in data for r in item["values"])}
+
+    def clear(self) -> dict:
+        self._record("write", "clear")
+        self._clear_range(None)
+        return {}
+
+
+class FakeSpreadsheet:
+    """In-memory stand-in for gspread.Spreadsheet."""
+
+    def __init__(self, client: "FakeClient", spreadsheet_id: str, title: str = ""):
+        self.client = client
+        self.id = spreadsheet_id
+        self.title = title or spreadsheet_id
+        self._worksheets: dict[str, FakeWorksheet] = {}
+        self._next_sheet_id = 0
+        self.version = 1
+        self.modified_time = datetime.now(timezone.utc).isoformat()
+
+    def _record(self, kind: str, method: str, target: str | None = None) -> None:
+        self.client._record(kind, method, target or self.id)
+        if kind == "write":
+            self.version += 1
+            self.modified_time = datetime.now(timezone.utc).isoformat()
+
+    def _new_worksheet(self, title: str, values=None, rows: int = 1000, cols: int = 26) -> FakeWorksheet:
+        ws = FakeWorksheet(self, title, self._next_sheet_id, values, rows, cols)
+        self._next_sheet_id += 1
+        self._worksheets[title] = ws
+        return ws
+
+    def _resolve(self, range_name: str) -> tuple[FakeWorksheet, str | None]:
+        title, a1 = _split_range(range_name)
+        if title is None:
+            title = next(iter(self._worksheets))
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title], a1
+
+    # ----- gspread surface -----
+    def fetch_sheet_metadata(self, params=None) -> dict:
+        self._record("read", "fetch_sheet_metadata")
+        return {
+            "spreadsheetId": self.id,
+            "properties": {"title": self.title},
+            "sheets": [
+                {
+                    "properties": {
+                        "sheetId": ws.id,
+                        "title": ws.title,
+                        "index": index,
+                        "gridProperties": {"rowCount": ws.row_count, "columnCount": ws.col_count},
+                    }
+                }
+                for index, ws in enumerate(self._worksheets.values())
+            ],
+        }
+
+    def worksheets(self, exclude_hidden: bool = False) -> list[FakeWorksheet]:
+        self._record("read", "worksheets")
+        return list(self._worksheets.values())
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self._record("read", "worksheet")
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def add_worksheet(self, title: str, rows, cols, index=None) -> FakeWorksheet:
+        self._record("write", "add_worksheet")
+        return self._new_worksheet(title, rows=int(rows), cols=int(cols))
+
+    def batch_update(self, body: dict) -> dict:
+        self._record("write", "batch_update")
+        replies = []
+        by_id = {ws.id: ws for ws in self._worksheets.values()}
+        for request in body.get("requests", []):
+            if "addSheet" in request:
+                props = request["addSheet"]["properties"]
+                grid = props.get("gridProperties", {})
+                ws = self._new_worksheet(
+                    props["title"], rows=grid.get("rowCount", 1000), cols=grid.get("columnCount", 26)
+                )
+                replies.append({"addSheet": {"properties": {"sheetId": ws.id, "title": ws.title}}})
+            elif "updateSheetProperties" in request:
+                props = request["updateSheetProperties"]["properties"]
+                ws = by_id[props["sheetId"]]
+                grid = props.get("gridProperties", {})
+                ws.row_count = grid.get("rowCount", ws.row_count)
+                ws.col_count = grid.get("columnCount", ws.col_count)
+                replies.append({})
+            elif "deleteSheet" in request:
+                ws = by_id[request["deleteSheet"]["sheetId"]]
+                del self._worksheets[ws.title]
+                replies.append({})
+            else:
+                replies.append({})
+        return {"spreadsheetId": self.id, "replies": replies}
+
+    def values_batch_get(self, ranges: list[str], params=None) -> dict:
+        self._record("read", "values_batch_get")
+        value_ranges = []
+        for range_name in ranges:
+            ws, a1 = self._resolve(range_name)
+            value_ranges.append({"range": range_name, "values": ws._read_range(a1)})
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+    def values_batch_update(self, body: dict) -> dict:
+        self._record("write", "values_batch_update")
+        for item in body.get("data", []):
+            ws, a1 = self._resolve(item["range"])
+            ws._write_range(a1, item["values"])
+        return {"spreadsheetId": self.id, "totalUpdatedRanges": len(body.get("data", []))}
+
+    def values_batch_clear(self, params=None, body: dict | None = None) -> dict:
+        self._record("write", "values_batch_clear")
+        for range_name in (body or {}).get("ranges", []):
+            ws, a1 = self._resolve(range_name)
+            ws._clear_range(a1)
+        return {"spreadsheetId": self.id}
+
+
+class _FakeDriveResponse:
+    def __init__(self, payload: dict):
+        self._payload = payload
+
+    def json(self) -> dict:
+        return self._payload
+
+
+class _FakeHTTPClient:
+    """Answers the Drive file-metadata requests made through `client.http_client`."""
+
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    def request(self, method: str, endpoint: str, params=None, **kwargs) -> _FakeDriveResponse:
+        file_id = endpoint.rstrip("/").rsplit("/", 1)[-1]
+        self.client._record("drive", "drive_files_get", file_id)
+        spreadsheet = self.client._spreadsheets[file_id]
+        return _FakeDriveResponse(
+            {"id": file_id, "modifiedTime": spreadsheet.modified_time, "version": str(spreadsheet.version)}
+        )
+
+
+class FakeClient:
+    """
+    In-memory stand-in for an authorized gspread.Client.
+
+    Every call is recorded in `calls` (a CallLog). `latency` adds a sleep per
+    call; `error_rate` (0..1) and `error_on` (call numbers, 1-based) make
+    calls fail with the same APIError gspread raises on HTTP 429.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0,
+                 error_on: set[int] | None = None, seed: int | None = None):
+        self.calls = CallLog()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_on = set(error_on or ())
+        self._random = random.Random(seed)
+        self._spreadsheets: dict[str, FakeSpreadsheet] = {}
+        self.http_client = _FakeHTTPClient(self)
+
+    def _record(self, kind: str, method: str, target: str) -> None:
+        self.calls.record(kind, method, target)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.calls.count() in self.error_on or (
+            self.error_rate and self._random.random() < self.error_rate
+        ):
+            raise _quota_error()
+
+    def add_spreadsheet(self, spreadsheet_id: str, worksheets: dict[str, list[list]] | None = None,
+                        title: str = "") -> FakeSpreadsheet:
+        """Seed a spreadsheet (no accounting)."""
+        spreadsheet = FakeSpreadsheet(self, spreadsheet_id, title)
+        for ws_title, values in (worksheets or {}).items():
+            spreadsheet._new_worksheet(ws_title, values)
+        self._spreadsheets[spreadsheet_id] = spreadsheet
+        return spreadsheet
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        # gspread fetches the spreadsheet metadata when opening it
+        self._record("read", "open_by_key", key)
+        if key not in self._spreadsheets:
+            raise requests.HTTPError(f"Spreadsheet not found: {key}")
+        return self._spreadsheets[key]
+
+    @classmethod
+    def from_json(cls, path: str | Path, **kwargs) -> "FakeClient":
+        """
+        Load spreadsheets from a JSON fixture:
+        {"<spreadsheet id>": {"title": "...", "worksheets": {"<title>": [[...], ...]}}}
+        """
+        client = cls(**kwargs)
+        for spreadsheet_id, spec in json.loads(Path(path).read_text()).items():
+            client.add_spreadsheet(spreadsheet_id, spec.get("worksheets"), spec.get("title", ""))
+        return client
+
+    def to_json(self, path: str | Path) -> None:
+        """Dump the current contents in the `from_json` format."""
+        data = {
+            spreadsheet_id: {
+                "title": spreadsheet.title,
+                "worksheets": {ws.title: ws._snapshot() for ws in spreadsheet._worksheets.values()},
+            }
+            for spreadsheet_id, spreadsheet in self._spreadsheets.items()
+        }
+        Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False))
+
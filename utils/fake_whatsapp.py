@@ -0,0 +1,274 @@
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class FakeWhatsAppConfig:
+    """
+    Behaviour of the local Baileys stand-in.
+
+    `latency` (+ up to `jitter`) seconds are spent on every request;
+    `error_rates` maps an HTTP status to the probability a message fails
+    with it; `rate_limit` messages per second (burst `burst`) are accepted
+    before answering 429 with Retry-After. `bulk` advertises and serves
+    POST /send-bulk.
+    """
+
+    token: str = "test-token"
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rates: dict[int, float] = field(default_factory=dict)
+    rate_limit: float | None = None
+    burst: int = 1
+    bulk: bool = True
+    max_bulk: int = 100
+    connected: bool = True
+
+
+class _Bucket:
+    """Thread-safe token bucket that answers instead of waiting."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token; return 0, or the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class FakeWhatsAppServer:
+    """
+    Local HTTP stand-in of the Baileys REST server, for benchmarks and
+    offline runs without a WhatsApp session.
+
+    Serves GET /status, POST /send-message and (unless disabled) POST
+    /send-bulk, and counts everything it receives in `stats`.
+
+        with FakeWhatsAppServer(FakeWhatsAppConfig(latency=0.2)) as server:
+            bot = AsyncWhatsAppBot(server.send_url, server.config.token)
+    """
+
+    def __init__(
+        self, config: FakeWhatsAppConfig | None = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.config = config or FakeWhatsAppConfig()
+        self.stats = {"requests": 0, "messages": 0, "sent": 0, "failed": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+        self._bucket = (
+            _Bucket(self.config.rate_limit, self.config.burst) if self.config.rate_limit else None
+        )
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def send_url(self) -> str:
+        """The WHATSAPP_URL to point clients at."""
+        return f"{self.url}/send-message"
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until `stop()` (or Ctrl+C)."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def start(self) -> "FakeWhatsAppServer":
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeWhatsAppServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def _deliver(self, payload: dict) -> tuple[int, dict, float]:
+        """Outcome of one message: (status, body, retry_after)."""
+        self._count(messages=1)
+        if not payload.get("number") or not payload.get("message"):
+            self._count(failed=1)
+            return 400, {"status": False, "error": "number and message are required"}, 0.0
+
+        if self._bucket and (wait := self._bucket.take()):
+            self._count(rate_limited=1, failed=1)
+            return 429, {"status": False, "error": "rate limited"}, wait
+
+        roll = random.random()
+        for status, rate in self.config.error_rates.items():
+            if roll < rate:
+                self._count(failed=1)
+                return status, {"status": False, "error": f"simulated {status}"}, 0.0
+            roll -= rate
+
+        self._count(sent=1)
+        return 200, {"status": True, "id": f"FAKE{random.getrandbits(48):012X}"}, 0.0
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; don't let Nagle delay keep-alive replies
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _reply(self, status: int, body: dict, retry_after: float = 0.0) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if retry_after:
+                    self.send_header("Retry-After", f"{retry_after:.3f}")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _begin(self) -> bool:
+                server._count(requests=1)
+                config = server.config
+                if config.latency or config.jitter:
+                    time.sleep(config.latency + random.uniform(0, config.jitter))
+                if self.headers.get("Authorization") != f"Bearer {config.token}":
+                    self._reply(401, {"status": False, "error": "invalid token"})
+                    return False
+                return True
+
+            def _body(self) -> dict | list | None:
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    return json.loads(self.rfile.read(length) or b"null")
+                except ValueError:
+                    return None
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") != "/status":
+                    self._reply(404, {"status": False, "error": "not found"})
+                    return
+                if not self._begin():
+                    return
+                self._reply(
+                    200,
+                    {
+                        "connected": server.config.connected,
+                        "whatsapp_status": "open" if server.config.connected else "close",
+                        "features": ["send-bulk"] if server.config.bulk else [],
+                        "max_bulk": server.config.max_bulk,
+                    },
+                )
+
+            def do_POST(self) -> None:
+                path = self.path.rstrip("/")
+                if path not in ("/send-message", "/send-bulk") or (
+                    path == "/send-bulk" and not server.config.bulk
+                ):
+                    self._body()
+                    self._reply(404, {"status": False, "error": "not found"})
+                    return
+                if not self._begin():
+                    self._body()
+                    return
+
+                body = self._body()
+                if path == "/send-message":
+                    status, reply, retry_after = server._deliver(body if isinstance(body, dict) else {})
+                    self._reply(status, reply, retry_after)
+                    return
+
+                messages = body.get("messages") if isinstance(body, dict) else None
+                if not isinstance(messages, list) or len(messages) > server.config.max_bulk:
+                    self._reply(400, {"status": False, "error": "messages must be a list"})
+                    return
+                results = []
+                for message in messages:
+                    status, reply, retry_after = server._deliver(
+                        message if isinstance(message, dict) else {}
+                    )
+                    results.append({"code": status, "retry_after": retry_after, **reply})
+                self._reply(200, {"status": True, "results": results})
+
+        return Handler
+
+
+def _error_rate(value: str) -> tuple[int, float]:
+    status, rate = value.split(":")
+    return int(status), float(rate)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in of the Baileys WhatsApp REST server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--token", default=FakeWhatsAppConfig.token)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra seconds per request.")
+    parser.add_argument(
+        "--error",
+        type=_error_rate,
+        action="append",
+        default=[],
+        metavar="STATUS:RATE",
+        help="Fail this share of messages with STATUS, e.g. 500:0.05 (repeatable).",
+    )
+    parser.add_argument("--rate-limit", type=float, help="Messages per second before answering 429.")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--no-bulk", action="store_true", help="Do not serve /send-bulk.")
+    parser.add_argument("--disconnected", action="store_true", help="Report the session as closed.")
+    args = parser.parse_args(argv)
+
+    config = FakeWhatsAppConfig(
+        token=args.token,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rates=dict(args.error),
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        bulk=not args.no_bulk,
+        connected=not args.disconnected,
+    )
+    server = FakeWhatsAppServer(config, args.host, args.port)
+    print(f"📱 Fake WhatsApp API on {server.send_url} (token {config.token!r})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {server.stats}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
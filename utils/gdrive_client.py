@@ -3,11 +3,23 @@ from dotenv import load_dotenv
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
 
+from helpers.credentials import get_credential_provider
+
 load_dotenv()
 
-def connect_gdrive():
+def connect_gdrive(scopes: list[str] | None = None):
+    """
+    Connect to Google Drive.
+
+    With GOOGLE_DRIVE_CRED set, the saved OAuth credentials file is used as
+    before. Otherwise the service account of the shared credential provider
+    is used (the same one as Sheets), reusing its access token.
+    """
     gauth = GoogleAuth()
-    gauth.LoadCredentialsFile(os.getenv("GOOGLE_DRIVE_CRED"))
+    if cred_file := os.getenv("GOOGLE_DRIVE_CRED"):
+        gauth.LoadCredentialsFile(cred_file)
+    else:
+        gauth.credentials = get_credential_provider(scopes).drive_credentials()
     if gauth.credentials is None:
         raise ValueError("❌ Credentials belum ada, buat dulu di Google API Console")
     drive = GoogleDrive(gauth)
@@ -0,0 +1,282 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PROFILE_DIR = PROJECT_ROOT / ".cache"
+METRIC_PREFIX = "jadwal"
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+class Metrics:
+    """
+    Run metrics: wall time per pipeline stage, counters and gauges.
+
+    `stage()` times a block (call count, total/max seconds, errors), `count()`
+    adds to a counter (calls, bytes, retries, waits) and `set()` records a
+    gauge. `run()` marks one pipeline run (e.g. a `serve` cycle); without
+    any, the whole process counts as the last run. Collectors registered
+    with `add_collector()` (e.g. the Sheets scheduler stats) are read when
+    the metrics are written.
+
+    `flush()` writes a JSON summary and a Prometheus textfile-collector file
+    to the paths given to `configure()`. Thread-safe, so stages running in
+    `asyncio.to_thread` can record too.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[tuple[str, tuple], dict] = {}
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._gauges: dict[tuple[str, tuple], float] = {}
+        self._runs: dict[tuple, tuple[float, float]] = {}
+        self._collectors = []
+        self.started_at = time.time()
+        self.json_path: Path | None = None
+        self.textfile_path: Path | None = None
+
+    def configure(
+        self, json_path: str | Path | None = None, textfile_path: str | Path | None = None
+    ) -> None:
+        """Set where `flush()` writes; a falsy path disables that output."""
+        self.json_path = Path(json_path) if json_path else None
+        self.textfile_path = Path(textfile_path) if textfile_path else None
+
+    # ----- recording -----
+    @contextmanager
+    def stage(self, name: str, **labels):
+        """Time the enclosed block as one run of stage `name`."""
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (name, _labels_key(labels))
+            with self._lock:
+                entry = self._stages.setdefault(
+                    key, {"runs": 0, "errors": 0, "seconds_total": 0.0, "seconds_max": 0.0}
+                )
+                entry["runs"] += 1
+                entry["errors"] += int(failed)
+                entry["seconds_total"] += elapsed
+                entry["seconds_max"] = max(entry["seconds_max"], elapsed)
+
+    @contextmanager
+    def run(self, **labels):
+        """Record the enclosed block as the last run (start time and duration)."""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._runs[_labels_key(labels)] = (started_at, time.perf_counter() - start)
+
+    def _last_runs(self) -> dict[tuple, tuple[float, float]]:
+        """{labels: (start, duration)} per recorded run, else the process so far."""
+        return dict(self._runs) or {(): (self.started_at, time.time() - self.started_at)}
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[(name, _labels_key(labels))] = value
+
+    def add_collector(self, collector) -> None:
+        """Register a callable returning {gauge name: value}, read at flush time."""
+        self._collectors.append(collector)
+
+    # ----- output -----
+    def _collect(self) -> None:
+        for collector in self._collectors:
+            for name, value in collector().items():
+                self.set(name, value)
+
+    def summary(self) -> dict:
+        self._collect()
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "stages": [
+                    {"stage": name, **dict(labels), **{k: round(v, 6) for k, v in entry.items()}}
+                    for (name, labels), entry in sorted(self._stages.items())
+                ],
+                "counters": [
+                    {"name": name, **dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "gauges": [
+                    {"name": name, **dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._gauges.items())
+                ],
+                "last_runs": [
+                    {**dict(labels), "started_at": started_at, "duration_seconds": round(duration, 3)}
+                    for labels, (started_at, duration) in sorted(self._last_runs().items())
+                ],
+            }
+
+    def prometheus(self) -> str:
+        self._collect()
+        lines = []
+
+        def family(name: str, kind: str, help_text: str, samples: list[tuple[tuple, float]]):
+            if not samples:
+                return
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(
+                f"{metric}{_format_labels(key)} {float(value)!r}" for key, value in samples
+            )
+
+        with self._lock:
+            stages = sorted(self._stages.items())
+            stage_samples = {
+                field: [
+                    ((("stage", name),) + labels, entry[field])
+                    for (name, labels), entry in stages
+                ]
+                for field in ("runs", "errors", "seconds_total", "seconds_max")
+            }
+            counters, gauges = {}, {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append((labels, value))
+            for (name, labels), value in sorted(self._gauges.items()):
+                gauges.setdefault(name, []).append((labels, value))
+            last_runs = sorted(self._last_runs().items())
+
+        for field, kind, help_text in (
+            ("runs", "counter", "Runs of each pipeline stage."),
+            ("errors", "counter", "Failed runs of each pipeline stage."),
+            ("seconds_total", "counter", "Wall time spent in each pipeline stage."),
+            ("seconds_max", "gauge", "Slowest single run of each pipeline stage."),
+        ):
+            name = f"stage_{field}" if field.startswith("seconds") else f"stage_{field}_total"
+            family(name, kind, help_text, stage_samples[field])
+        for name, samples in counters.items():
+            family(f"{name}_total", "counter", f"Total {name.replace('_', ' ')}.", samples)
+        for name, samples in gauges.items():
+            family(name, "gauge", f"Last {name.replace('_', ' ')}.", samples)
+        family(
+            "last_run_timestamp_seconds",
+            "gauge",
+            "Start of the last run.",
+            [(labels, started_at) for labels, (started_at, _) in last_runs],
+        )
+        family(
+            "last_run_duration_seconds",
+            "gauge",
+            "Wall time of the last run.",
+            [(labels, duration) for labels, (_, duration) in last_runs],
+        )
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """Write the JSON summary and the Prometheus textfile (atomically) if configured."""
+        for path, render in (
+            (self.json_path, lambda: json.dumps(self.summary(), indent=2)),
+            (self.textfile_path, self.prometheus),
+        ):
+            if path is None:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # node_exporter may read at any time: never expose a partial file
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            tmp_path.write_text(render())
+            os.replace(tmp_path, path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics registry."""
+    return _metrics
+
+
+def track_requests_session(session, api: str) -> None:
+    """Count requests/bytes of a `requests` session (gspread's AuthorizedSession)."""
+
+    def on_response(response, *args, **kwargs):
+        body = response.request.body or b""
+        _metrics.count("http_requests", api=api, status=response.status_code)
+        _metrics.count("http_bytes_sent", len(body), api=api)
+        _metrics.count("http_bytes_received", len(response.content), api=api)
+
+    session.hooks["response"].append(on_response)
+
+
+# tracemalloc is process-wide: profiled stages (one per parish thread) run one at a time
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def profile_stage(name: str, enabled: bool, output_dir: str | Path | None = None, top: int = 15):
+    """
+    Opt-in cProfile + tracemalloc around a stage. Writes `profile-<name>.pstats`
+    and prints the top functions by cumulative time and the top allocations.
+    Concurrent profiled stages wait for each other, so each gets its own
+    trace and peak.
+    """
+    if not enabled:
+        yield
+        return
+
+    output_dir = Path(output_dir or DEFAULT_PROFILE_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with _profile_lock:
+        with _profiled(name, output_dir, top):
+            yield
+
+
+@contextmanager
+def _profiled(name: str, output_dir: Path, top: int):
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        pstats_path = output_dir / f"profile-{name}.pstats"
+        profiler.dump_stats(pstats_path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        print(f"🔬 Profile of {name} (saved to {pstats_path}):\n{out.getvalue()}", flush=True)
+
+        print(f"🔬 Memory of {name}: peak {peak / 1024:.0f} KiB, top allocations:", flush=True)
+        for stat in snapshot.statistics("lineno")[:top]:
+            print(f"   {stat}", flush=True)
+        _metrics.set("profile_peak_memory_bytes", peak, stage=name)
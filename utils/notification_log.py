@@ -0,0 +1,154 @@
+import re
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from gspread.exceptions import WorksheetNotFound
+
+from utils.metrics import get_metrics
+from utils.number import normalize_number
+
+LOG_SHEET_NAME = "Notification Chat Log"
+LOG_HEADERS = [
+    "Timestamp",
+    "Name",
+    "Chat Id / Whatsapp No",
+    "Message Preview",
+    "Schedule Hash",
+    "Status",
+    "Platform",
+]
+
+
+def make_log_key(id: str, platform: str) -> tuple[str, str]:
+    """Build the lookup key (normalized id, platform) used by the log index."""
+    platform = str(platform).strip().lower()
+    if platform == "telegram":
+        return str(id).strip(), platform
+    return normalize_number(id).strip(), platform
+
+
+def _first_appended_row(response: dict | None) -> int | None:
+    """Extract the first row number from an append response ("'Sheet'!A12:G14" -> 12)."""
+    updated_range = ((response or {}).get("updates") or {}).get("updatedRange", "")
+    match = re.search(r"![A-Z]+(\d+)", updated_range)
+    return int(match.group(1)) if match else None
+
+
+class NotificationLog:
+    """
+    In-memory index of the "Notification Chat Log" worksheet.
+
+    The sheet is read once by `load()`, lookups are served from a dict keyed by
+    (normalized id, platform) and every status change is buffered until
+    `flush()` commits them as one `batch_update` plus one `append_rows`.
+    """
+
+    def __init__(self, spreadsheet, sheet_name: str = LOG_SHEET_NAME):
+        self.spreadsheet = spreadsheet
+        self.sheet_name = sheet_name
+        self.sheet = None
+        self._index: dict[tuple[str, str], tuple[int | None, dict]] = {}
+        self._dirty_rows: dict[int, list] = {}
+        self._new_rows: dict[tuple[str, str], list] = {}
+
+    def load(self) -> "NotificationLog":
+        """Read the whole log sheet once and index it. Creates the sheet if missing."""
+        with get_metrics().stage("log_load"):
+            return self._load()
+
+    def _load(self) -> "NotificationLog":
+        try:
+            self.sheet = self.spreadsheet.worksheet(self.sheet_name)
+        except WorksheetNotFound:
+            self.sheet = self.spreadsheet.add_worksheet(
+                title=self.sheet_name, rows="10", cols=str(len(LOG_HEADERS))
+            )
+            self.sheet.append_row(LOG_HEADERS)
+            return self
+
+        values = self.sheet.get_all_values()
+        if not values:
+            return self
+
+        headers = values[0]
+        # Later rows win, matching the old "search from bottom" behaviour
+        for row_number, row in enumerate(values[1:], start=2):
+            record = dict(zip(headers, row))
+            key = make_log_key(
+                record.get("Chat Id / Whatsapp No", ""), record.get("Platform", "")
+            )
+            if not key[0]:
+                continue
+            self._index[key] = (row_number, record)
+        return self
+
+    def get(self, id: str, platform: str) -> dict | None:
+        """Return the latest log entry for the given id and platform, or None."""
+        entry = self._index.get(make_log_key(id, platform))
+        return entry[1] if entry else None
+
+    def entries(self) -> list[dict]:
+        """Return the latest log entry of every id and platform."""
+        return [record for _, record in self._index.values()]
+
+    def record(
+        self,
+        name: str,
+        id: str,
+        preview: str,
+        hash_value: str,
+        status: str,
+        platform: str,
+        timestamp: str | None = None,
+    ) -> None:
+        """Buffer an update (or insert) ensuring only one record exists per id and platform."""
+        key = make_log_key(id, platform)
+        timestamp = timestamp or datetime.now(ZoneInfo("Asia/Jakarta")).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        values = [
+            timestamp,
+            name,
+            id if key[1] == "telegram" else normalize_number(id),
+            preview,
+            hash_value,
+            status,
+            platform,
+        ]
+        row_number = self._index[key][0] if key in self._index else None
+
+        if row_number is None:
+            self._new_rows[key] = values
+        else:
+            self._dirty_rows[row_number] = values
+        self._index[key] = (row_number, dict(zip(LOG_HEADERS, values)))
+
+    def flush(self) -> None:
+        """Commit all buffered changes: one batch update and one append."""
+        if self.sheet is None:
+            raise RuntimeError("NotificationLog.load() must be called before flush().")
+        with get_metrics().stage("log_flush"):
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._dirty_rows:
+            self.sheet.batch_update(
+                [
+                    {"range": f"A{idx}:G{idx}", "values": [values]}
+                    for idx, values in sorted(self._dirty_rows.items())
+                ]
+            )
+        if self._new_rows:
+            response = self.sheet.append_rows(list(self._new_rows.values()))
+            first_row = _first_appended_row(response)
+            if first_row is not None:
+                for offset, key in enumerate(self._new_rows):
+                    self._index[key] = (first_row + offset, self._index[key][1])
+
+        print(
+            f"📝 Notification log flushed: {len(self._dirty_rows)} updated, "
+            f"{len(self._new_rows)} appended",
+            flush=True,
+        )
+        self._dirty_rows.clear()
+        self._new_rows.clear()
@@ -0,0 +1,190 @@
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from utils.notification_log import make_log_key
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / ".cache" / "notifications.db"
+
+def default_db_path() -> Path:
+    """NOTIFICATION_DB_PATH, or `.cache/notifications.db` in the project."""
+    return Path(os.getenv("NOTIFICATION_DB_PATH") or DEFAULT_DB_PATH)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    name TEXT NOT NULL,
+    contact TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    preview TEXT NOT NULL,
+    schedule_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    mirrored INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_contact
+    ON notifications (contact, platform, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_unmirrored
+    ON notifications (mirrored) WHERE mirrored = 0;
+"""
+
+
+class NotificationStore:
+    """
+    Local SQLite history of every notification attempt.
+
+    This is the source of truth for dedupe: `latest_delivered()` is an
+    indexed lookup by (contact, platform), so it keeps working when Sheets is
+    slow or throttled. Every attempt is kept as its own row (audit trail); the
+    "Notification Chat Log" sheet only receives a summarized view (latest attempt per contact) through
+    `unmirrored()` / `mark_mirrored()`.
+
+    The database lives at NOTIFICATION_DB_PATH (default
+    `.cache/notifications.db`) so it can persist on a Docker or CI cache volume.
+    With `read_only` (dry runs) the file, if any, is copied into memory and
+    never created or changed.
+    """
+
+    def __init__(self, path: str | Path | None = None, read_only: bool = False):
+        self.path = Path(path or default_db_path())
+        if read_only:
+            self.conn = sqlite3.connect(":memory:")
+            if self.path.exists():
+                with sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True) as source:
+                    source.backup(self.conn)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "NotificationStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM notifications LIMIT 1").fetchone() is None
+
+    def latest(self, id: str, platform: str) -> dict | None:
+        """Return the most recent attempt for the given id and platform, or None."""
+        contact, platform = make_log_key(id, platform)
+        row = self.conn.execute(
+            "SELECT * FROM notifications WHERE contact = ? AND platform = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (contact, platform),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def latest_delivered(self, id: str, platform: str, name: str | None = None) -> dict | None:
+        """
+        Most recent successful attempt ("sent", or "skipped" as already sent)
+        for the given id and platform, optionally only for reminders to `name`
+        (a contact in two rosters gets one reminder per name). Failed attempts
+        never count as delivered.
+        """
+        contact, platform = make_log_key(id, platform)
+        query = (
+            "SELECT * FROM notifications WHERE contact = ? AND platform = ? "
+            "AND status IN ('sent', 'skipped')"
+        )
+        params = [contact, platform]
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+        row = self.conn.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def history(self, id: str, platform: str) -> list[dict]:
+        """Return every attempt for the given id and platform, oldest first."""
+        contact, platform = make_log_key(id, platform)
+        rows = self.conn.execute(
+            "SELECT * FROM notifications WHERE contact = ? AND platform = ? ORDER BY id",
+            (contact, platform),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _row(
+        self,
+        name: str,
+        id: str,
+        preview: str,
+        hash_value: str,
+        status: str,
+        platform: str,
+        timestamp: str | None = None,
+        mirrored: bool = False,
+    ) -> tuple:
+        contact, platform = make_log_key(id, platform)
+        timestamp = timestamp or datetime.now(ZoneInfo("Asia/Jakarta")).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        return (timestamp, name, contact, platform, preview, hash_value, status, int(mirrored))
+
+    def _insert(self, rows: list[tuple]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO notifications "
+                "(timestamp, name, contact, platform, preview, schedule_hash, status, mirrored) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def record(
+        self,
+        name: str,
+        id: str,
+        preview: str,
+        hash_value: str,
+        status: str,
+        platform: str,
+    ) -> None:
+        """Append one attempt to the history."""
+        self._insert([self._row(name, id, preview, hash_value, status, platform)])
+
+    def import_log(self, notification_log) -> int:
+        """
+        Seed an empty store from a loaded NotificationLog (e.g. on a fresh CI
+        cache), so dedupe does not resend everything. Returns the rows imported.
+        """
+        rows = [
+            self._row(
+                record.get("Name", ""),
+                id=record.get("Chat Id / Whatsapp No", ""),
+                preview=record.get("Message Preview", ""),
+                hash_value=record.get("Schedule Hash", ""),
+                status=record.get("Status", ""),
+                platform=record.get("Platform", ""),
+                timestamp=record.get("Timestamp") or None,
+                mirrored=True,
+            )
+            for record in notification_log.entries()
+        ]
+        self._insert(rows)
+        return len(rows)
+
+    def unmirrored(self) -> list[dict]:
+        """Latest unmirrored attempt per (contact, platform)."""
+        rows = self.conn.execute(
+            "SELECT * FROM notifications WHERE id IN ("
+            "  SELECT MAX(id) FROM notifications WHERE mirrored = 0 GROUP BY contact, platform"
+            ") ORDER BY id"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_mirrored(self, up_to_id: int) -> None:
+        """Flag every attempt up to `up_to_id` as pushed to the sheet."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE notifications SET mirrored = 1 WHERE mirrored = 0 AND id <= ?",
+                (up_to_id,),
+            )
+
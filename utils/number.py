@@ -1,20 +1,100 @@
 import re
+from functools import lru_cache
+
+# Patterns compiled once; every normalizer below is memoized on top of them
+NON_NUMBER_CHARS = re.compile(r"[^\d+]")
+NON_DIGITS = re.compile(r"\D")
+LETTERS = re.compile(r"[A-Za-z]")
+TELEGRAM_CHAT_ID = re.compile(r"-?\d+")
+
 
 # ---------- Number Normalization ----------
+@lru_cache(maxsize=4096)
 def normalize_number(num: str) -> str:
-    """Normalize phone numbers to simplified E.164 format (+62...)."""
+    """
+    Key of a phone number in the notification log and store: the number
+    `normalize_whatsapp_number` validates and sends, as "+62...". Values it
+    rejects (e.g. old log rows) fall back to "+" and their digits.
+    """
     if not num:
         return ""
-    s = re.sub(r"[^\d+]", "", str(num))
-    digits = re.sub(r"\D", "", s)
-    if not digits:
+    try:
+        return "+" + normalize_whatsapp_number(num)
+    except ValueError:
+        digits = NON_DIGITS.sub("", str(num))
+        return "+" + digits if digits else ""
+
+
+@lru_cache(maxsize=4096)
+def normalize_whatsapp_number(number: str) -> str:
+    """
+    valid for indonesian number only
+    Normalize phone number to format: 628xxxxxxxxx
+
+    :raises ValueError: if the number is not a valid Indonesian number
+    """
+    cleaned = NON_NUMBER_CHARS.sub("", str(number))
+
+    if LETTERS.search(cleaned):
+        raise ValueError("Phone number must not contain letters.")
+
+    cleaned = cleaned.lstrip("+")
+
+    if cleaned.startswith("0"):
+        cleaned = "62" + cleaned[1:]
+    elif cleaned.startswith("8"):
+        cleaned = "62" + cleaned
+    elif cleaned.startswith("62"):
+        pass
+    else:
+        raise ValueError(f"Invalid phone format: {number}")
+
+    if not cleaned.isdigit():
+        raise ValueError(f"Phone number contains invalid characters: {number}")
+
+    if len(cleaned) < 10:
+        raise ValueError(f"Phone number too short: {number}")
+
+    return cleaned
+
+
+def _cell(value) -> str:
+    """Raw cell as stripped text; None and NaN become ""."""
+    if value is None or value != value:
         return ""
-    if s.startswith("+"):
-        return "+" + digits
-    if digits.startswith("0"):
-        return "+62" + digits[1:]
-    if digits.startswith("62"):
-        return "+" + digits
-    if digits.startswith("8"):
-        return "+62" + digits
-    return "+" + digits
\ No newline at end of file
+    return str(value).strip()
+
+
+def normalize_whatsapp_numbers(values):
+    """
+    Normalize a list, dict or pandas Series of numbers in one pass.
+
+    Each distinct value is normalized once. Returns (normalized, invalid):
+    `normalized` has the same shape as `values` with None for blank or
+    invalid entries, `invalid` maps each invalid raw value to the reason.
+    """
+    raw_values = list(values.values()) if isinstance(values, dict) else list(values)
+    mapping, invalid = {}, {}
+    for raw in {_cell(value) for value in raw_values}:
+        if not raw:
+            mapping[raw] = None
+            continue
+        try:
+            mapping[raw] = normalize_whatsapp_number(raw)
+        except ValueError as e:
+            mapping[raw] = None
+            invalid[raw] = str(e)
+
+    def lookup(value):
+        return mapping[_cell(value)]
+
+    if isinstance(values, dict):
+        return {key: lookup(value) for key, value in values.items()}, invalid
+    if hasattr(values, "map"):
+        return values.map(lookup), invalid
+    return [lookup(value) for value in raw_values], invalid
+
+
+def is_valid_telegram_chat_id(chat_id: str) -> bool:
+    """Telegram chat ids are integers (negative for groups)."""
+    return bool(TELEGRAM_CHAT_ID.fullmatch(_cell(chat_id)))
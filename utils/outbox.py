@@ -0,0 +1,253 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+from utils.dispatcher import NotificationJob
+from utils.metrics import get_metrics
+from utils.notification_log import make_log_key
+from utils.notification_store import default_db_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    contact TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    text TEXT NOT NULL,
+    schedule_hash TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due
+    ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_contact
+    ON outbox (contact, platform, status);
+"""
+
+# Job states: pending → sending → sent, or back to pending with a backoff,
+# or dead once out of attempts; superseded when a newer schedule is queued
+PENDING, SENDING, SENT, DEAD, SUPERSEDED = "pending", "sending", "sent", "dead", "superseded"
+
+
+def idempotency_key(id: str, platform: str, hash_value: str) -> str:
+    """Stable key of one reminder: (normalized contact, platform, schedule hash)."""
+    contact, platform = make_log_key(id, platform)
+    return hashlib.sha256(f"{contact}\0{platform}\0{hash_value}".encode()).hexdigest()
+
+
+class NotificationOutbox:
+    """
+    Durable queue of reminders to send, next to the history in the SQLite
+    notification database.
+
+    Every reminder is enqueued under its idempotency key, so queueing the
+    same schedule twice is a no-op and a newer schedule for the same
+    contact supersedes an unsent older one. `claim_due()` hands out jobs
+    whose backoff has elapsed; `complete()` / `fail()` settle them. A failed
+    job is retried after `base_backoff * 2**(attempts - 1)` seconds (capped
+    at `max_backoff`) and dead-lettered after `max_attempts` attempts or
+    once older than `max_age`. Jobs left in `sending` by a crashed run go
+    back to pending when the outbox is opened.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        max_attempts: int = 8,
+        base_backoff: float = 60,
+        max_backoff: float = 6 * 3600,
+        max_age: float = 2 * 86400,
+    ):
+        self.path = Path(path or default_db_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_age = max_age
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._recover()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "NotificationOutbox":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _recover(self) -> None:
+        """Requeue jobs a crashed run claimed but never settled (at-least-once delivery)."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, updated_at = ? WHERE status = ?",
+                (PENDING, time.time(), SENDING),
+            )
+
+    def get(self, key: str) -> dict | None:
+        row = self.conn.execute("SELECT * FROM outbox WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def enqueue(self, job: NotificationJob) -> str:
+        """
+        Queue `job` under its idempotency key (set on `job.key`) and return
+        the key's state: "pending" when newly queued, otherwise the state of
+        the job already stored under that key.
+
+        Callers only enqueue schedules that are not the contact's latest
+        delivered one, so a key that was sent or superseded before (a
+        schedule changed A → B → A) is queued again with fresh attempts.
+        Dead-lettered keys stay dead until `requeue_dead()`.
+        """
+        contact, platform = make_log_key(job.recipient, job.platform)
+        job.key = job.key or idempotency_key(job.recipient, job.platform, job.hash_value)
+        now = time.time()
+        with self.conn:
+            self._supersede(contact, platform, job.name, job.key, now)
+            self.conn.execute(
+                "INSERT OR IGNORE INTO outbox "
+                "(key, name, contact, platform, recipient, text, schedule_hash, "
+                "next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.key, job.name, contact, platform, job.recipient, job.text,
+                 job.hash_value, now, now, now),
+            )
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, name = ?, recipient = ?, text = ?, attempts = 0, "
+                "next_attempt_at = ?, last_error = NULL, created_at = ?, updated_at = ? "
+                "WHERE key = ? AND status IN (?, ?)",
+                (PENDING, job.name, job.recipient, job.text, now, now, now, job.key,
+                 SENT, SUPERSEDED),
+            )
+        return self.get(job.key)["status"]
+
+    def _supersede(self, contact: str, platform: str, name: str, key: str, now: float) -> int:
+        # An unsent reminder of an older schedule must not go out after this one
+        # (reminders to another name of the same contact, i.e. another role, stay)
+        cursor = self.conn.execute(
+            "UPDATE outbox SET status = ?, updated_at = ? "
+            "WHERE contact = ? AND platform = ? AND name = ? AND status = ? AND key != ?",
+            (SUPERSEDED, now, contact, platform, name, PENDING, key),
+        )
+        return cursor.rowcount
+
+    def supersede(self, recipient: str, platform: str, name: str, hash_value: str) -> int:
+        """
+        Supersede the pending reminders of `name` on `platform` whose schedule
+        is not `hash_value`, e.g. because that schedule was already delivered
+        and is current again (A → B → A); returns how many.
+        """
+        contact, platform = make_log_key(recipient, platform)
+        with self.conn:
+            return self._supersede(
+                contact, platform, name, idempotency_key(recipient, platform, hash_value), time.time()
+            )
+
+    def _expire(self, now: float) -> None:
+        expired = self.conn.execute(
+            "SELECT key, platform FROM outbox WHERE status = ? AND created_at < ?",
+            (PENDING, now - self.max_age),
+        ).fetchall()
+        if not expired:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = ?, last_error = COALESCE(last_error, 'expired'), "
+                "updated_at = ? WHERE key = ?",
+                [(DEAD, now, row["key"]) for row in expired],
+            )
+        for row in expired:
+            get_metrics().count("outbox_jobs", platform=row["platform"], status=DEAD)
+
+    def claim_due(self, limit: int | None = None) -> list[NotificationJob]:
+        """Mark the jobs whose backoff has elapsed as sending and return them, oldest first."""
+        now = time.time()
+        self._expire(now)
+        rows = self.conn.execute(
+            "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+            "ORDER BY next_attempt_at, created_at LIMIT ?",
+            (PENDING, now, -1 if limit is None else limit),
+        ).fetchall()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = ?, updated_at = ? WHERE key = ?",
+                [(SENDING, now, row["key"]) for row in rows],
+            )
+        return [
+            NotificationJob(
+                platform=row["platform"],
+                recipient=row["recipient"],
+                text=row["text"],
+                name=row["name"],
+                hash_value=row["schedule_hash"],
+                key=row["key"],
+            )
+            for row in rows
+        ]
+
+    def complete(self, job: NotificationJob) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = NULL, "
+                "updated_at = ? WHERE key = ?",
+                (SENT, time.time(), job.key),
+            )
+        get_metrics().count("outbox_jobs", platform=job.platform, status=SENT)
+
+    def fail(self, job: NotificationJob, error: str) -> str:
+        """Record a failed attempt; return the job's new state ("pending" or "dead")."""
+        row = self.get(job.key)
+        attempts = (row["attempts"] if row else 0) + 1
+        now = time.time()
+        if attempts >= self.max_attempts:
+            status, next_attempt_at = DEAD, now
+        else:
+            status = PENDING
+            next_attempt_at = now + min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, "
+                "last_error = ?, updated_at = ? WHERE key = ?",
+                (status, attempts, next_attempt_at, error, now, job.key),
+            )
+        get_metrics().count(
+            "outbox_jobs", platform=job.platform, status=DEAD if status == DEAD else "retry"
+        )
+        return status
+
+    def next_due_at(self) -> float | None:
+        """When the earliest pending job becomes due (epoch seconds), or None."""
+        row = self.conn.execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (PENDING,)
+        ).fetchone()
+        return row[0]
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs per state."""
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def dead_letters(self) -> list[dict]:
+        rows = self.conn.execute(
+            "SELECT * FROM outbox WHERE status = ? ORDER BY updated_at", (DEAD,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_dead(self) -> int:
+        """Give every dead-lettered job a fresh set of attempts; returns how many."""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, "
+                "created_at = ?, updated_at = ? WHERE status = ?",
+                (PENDING, now, now, now, DEAD),
+            )
+        return cursor.rowcount
@@ -0,0 +1,47 @@
+import asyncio
+import random
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket limiter.
+
+    Tokens refill at `rate` per second up to `capacity` (the burst size).
+    `jitter` adds a random extra delay of up to that many seconds after each
+    acquisition, so sends are not evenly spaced; no tokens refill during it,
+    so consecutive acquisitions are at least `1 / rate` plus the jitter apart.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1, jitter: float = 0.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+
+        self.rate = rate
+        self.capacity = capacity
+        self.jitter = jitter
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+            # Held under the lock so the jittered gap applies to the next caller too
+            if self.jitter:
+                await asyncio.sleep(random.uniform(0, self.jitter))
+                # The wait for the next token starts after the jitter, not before it
+                self._updated_at = time.monotonic()
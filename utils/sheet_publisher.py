@@ -0,0 +1,211 @@
+import hashlib
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+# Metadata cells (K1, K2, L2) live in columns K and L
+MIN_COLUMNS = 12
+
+# Tab content is read back from A:J for diffing (metadata starts at K)
+CONTENT_COLUMNS = "A:J"
+
+# Hidden worksheet holding one "title | content hash | updated at" row per tab
+STATE_SHEET_NAME = "_publish_state"
+STATE_HEADERS = ["Tab", "Content Hash", "Updated At"]
+
+
+def content_hash(values: list[list[str]], url: str) -> str:
+    """Hash of a tab's rendered content, excluding the Last Update timestamp."""
+    payload = json.dumps([values, url], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _changed_ranges(title: str, old: list[list[str]], new: list[list[str]]) -> list[dict]:
+    """Ranges covering only the rows that differ; rows the table shrank by are blanked."""
+    width = max([len(row) for row in old + new] + [1])
+    height = max(len(old), len(new))
+
+    def padded(rows: list[list[str]], i: int) -> list[str]:
+        row = rows[i] if i < len(rows) else []
+        return [str(v) for v in row] + [""] * (width - len(row))
+
+    ranges, start = [], None
+    for i in range(height + 1):
+        differs = i < height and padded(old, i) != padded(new, i)
+        if differs and start is None:
+            start = i
+        elif not differs and start is not None:
+            ranges.append(
+                {
+                    "range": absolute_range_name(
+                        title, f"{rowcol_to_a1(start + 1, 1)}:{rowcol_to_a1(i, width)}"
+                    ),
+                    "values": [padded(new, r) for r in range(start, i)],
+                }
+            )
+            start = None
+    return ranges
+
+
+class TabPublisher:
+    """
+    Collect every "Jadwal <Name>" DataFrame first, then publish them all at once.
+
+    Each tab's rendered content is hashed and the hash kept in a hidden
+    "_publish_state" sheet. Tabs whose hash did not change are left alone;
+    for changed tabs only the differing rows are rewritten (no clear), so
+    readers never see an empty tab.
+
+    `publish()` costs a fixed number of API calls regardless of roster size:
+    one metadata read, one state read, at most one content read of the
+    changed tabs, at most one `batch_update` to create/resize tabs and one
+    `values_batch_update` for all values, K1/K2/L2 cells and hashes.
+    """
+
+    def __init__(self, spreadsheet, state_sheet_name: str = STATE_SHEET_NAME):
+        self.spreadsheet = spreadsheet
+        self.state_sheet_name = state_sheet_name
+        self._tabs: dict[str, pd.DataFrame] = {}
+
+    def add(self, title: str, df: pd.DataFrame) -> None:
+        """Queue a DataFrame to be written to the worksheet `title`."""
+        self._tabs[title] = df
+
+    def _ensure_tabs(self, existing: dict, sizes: dict[str, tuple[int, int]]) -> None:
+        """Create missing tabs and grow undersized ones in one spreadsheet batch_update."""
+        requests = []
+
+        if self.state_sheet_name not in existing:
+            requests.append(
+                {
+                    "addSheet": {
+                        "properties": {
+                            "title": self.state_sheet_name,
+                            "hidden": True,
+                            "gridProperties": {"rowCount": 1000, "columnCount": len(STATE_HEADERS)},
+                        }
+                    }
+                }
+            )
+
+        for title, (rows_needed, cols_needed) in sizes.items():
+            rows = rows_needed + 10
+            cols = max(cols_needed + 5, MIN_COLUMNS)
+            ws = existing.get(title)
+
+            if ws is None:
+                requests.append(
+                    {
+                        "addSheet": {
+                            "properties": {
+                                "title": title,
+                                "gridProperties": {"rowCount": rows, "columnCount": cols},
+                            }
+                        }
+                    }
+                )
+            elif ws.row_count < rows_needed or ws.col_count < max(cols_needed, MIN_COLUMNS):
+                requests.append(
+                    {
+                        "updateSheetProperties": {
+                            "properties": {
+                                "sheetId": ws.id,
+                                "gridProperties": {
+                                    "rowCount": max(ws.row_count, rows),
+                                    "columnCount": max(ws.col_count, cols),
+                                },
+                            },
+                            "fields": "gridProperties.rowCount,gridProperties.columnCount",
+                        }
+                    }
+                )
+
+        if requests:
+            self.spreadsheet.batch_update({"requests": requests})
+
+    def _read_ranges(self, ranges: list[str]) -> list[list[list[str]]]:
+        """Read several ranges in one values_batch_get."""
+        if not ranges:
+            return []
+        response = self.spreadsheet.values_batch_get(ranges)
+        return [value_range.get("values", []) for value_range in response.get("valueRanges", [])]
+
+    def publish(self) -> dict[str, list[str]]:
+        """Write only the tabs whose content changed; return {"written": [...], "unchanged": [...]}."""
+        if not self._tabs:
+            return {"written": [], "unchanged": []}
+
+        tz = ZoneInfo("Asia/Jakarta")
+        now = datetime.now(tz)
+        last_update_str = f"Last Update: {now.strftime('%d-%b-%Y %H:%M:%S WIB')}"
+        today = datetime.today()
+        url = f"https://www.imankatolik.or.id/kalender.php?b={today.month}&t={today.year}"
+
+        existing = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+
+        # Previous hashes
+        state: dict[str, list[str]] = {}
+        if self.state_sheet_name in existing:
+            (state_rows,) = self._read_ranges([absolute_range_name(self.state_sheet_name)])
+            state = {row[0]: row for row in state_rows[1:] if row}
+
+        rendered = {
+            title: [df.columns.tolist()] + df.astype(str).values.tolist()
+            for title, df in self._tabs.items()
+        }
+        hashes = {title: content_hash(values, url) for title, values in rendered.items()}
+        changed = [
+            title
+            for title in self._tabs
+            if title not in existing or state.get(title, [None, None])[1] != hashes[title]
+        ]
+        unchanged = [title for title in self._tabs if title not in changed]
+
+        for title in unchanged:
+            print(f"⏭ Unchanged, not rewritten: {title}", flush=True)
+        if not changed:
+            self._tabs.clear()
+            return {"written": [], "unchanged": unchanged}
+
+        # Current content of the changed tabs that already exist, to diff against
+        to_read = [title for title in changed if title in existing]
+        previous = dict(
+            zip(
+                to_read,
+                self._read_ranges([absolute_range_name(title, CONTENT_COLUMNS) for title in to_read]),
+            )
+        )
+
+        self._ensure_tabs(
+            existing,
+            {title: (len(rendered[title]), len(rendered[title][0])) for title in changed},
+        )
+
+        data = []
+        for title in changed:
+            data += _changed_ranges(title, previous.get(title, []), rendered[title])
+            data += [
+                {"range": absolute_range_name(title, "K1"), "values": [[last_update_str]]},
+                {"range": absolute_range_name(title, "K2"), "values": [["Liturgical Calendar:"]]},
+                {"range": absolute_range_name(title, "L2"), "values": [[url]]},
+            ]
+            state[title] = [title, hashes[title], now.strftime("%Y-%m-%d %H:%M:%S")]
+
+        state_values = [STATE_HEADERS] + [state[title] for title in sorted(state)]
+        data.append(
+            {
+                "range": absolute_range_name(
+                    self.state_sheet_name, f"A1:{rowcol_to_a1(len(state_values), len(STATE_HEADERS))}"
+                ),
+                "values": state_values,
+            }
+        )
+        self.spreadsheet.values_batch_update(body={"valueInputOption": "RAW", "data": data})
+
+        for title in changed:
+            print(f"✅ Saved to Google Sheet: {title}", flush=True)
+        self._tabs.clear()
+        return {"written": changed, "unchanged": unchanged}
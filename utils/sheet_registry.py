@@ -0,0 +1,195 @@
+import threading
+from http import HTTPStatus
+
+import gspread
+from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+
+
+def _unwrapped(value):
+    return getattr(value, "unwrapped", value)
+
+
+class RegisteredSpreadsheet:
+    """
+    A spreadsheet handle whose worksheets are looked up in a title →
+    worksheet map instead of a metadata request per `worksheet()` call.
+
+    The map is built from the metadata fetched when the spreadsheet was
+    opened (or by one metadata fetch on first use) and kept current by the
+    calls made through this handle: `add_worksheet`, `del_worksheet` and
+    `batch_update` (addSheet / deleteSheet / updateSheetProperties). Every
+    other attribute goes straight to the wrapped spreadsheet.
+    """
+
+    def __init__(self, spreadsheet, metadata: dict | None = None):
+        self._spreadsheet = spreadsheet
+        self._lock = threading.RLock()
+        self._tabs: dict | None = None
+        if metadata is not None:
+            tabs = [self._worksheet_from(sheet["properties"]) for sheet in metadata["sheets"]]
+            self._tabs = {ws.title: ws for ws in tabs}
+
+    @property
+    def unwrapped(self):
+        return _unwrapped(self._spreadsheet)
+
+    def __getattr__(self, name: str):
+        return getattr(self._spreadsheet, name)
+
+    def __repr__(self) -> str:
+        return f"RegisteredSpreadsheet({self._spreadsheet!r})"
+
+    def _map(self) -> dict:
+        with self._lock:
+            if self._tabs is None:
+                # One fetch_sheet_metadata call (after invalidate(), or for non-gspread clients)
+                self._tabs = {ws.title: ws for ws in self._spreadsheet.worksheets()}
+            return self._tabs
+
+    def invalidate(self) -> None:
+        """Forget the tab map; the next lookup fetches the metadata again."""
+        with self._lock:
+            self._tabs = None
+
+    def worksheets(self, exclude_hidden: bool = False) -> list:
+        tabs = list(self._map().values())
+        if exclude_hidden:
+            tabs = [ws for ws in tabs if not getattr(ws, "isSheetHidden", False)]
+        return tabs
+
+    def worksheet(self, title: str):
+        try:
+            return self._map()[title]
+        except KeyError:
+            raise WorksheetNotFound(title) from None
+
+    def add_worksheet(self, title: str, rows, cols, index=None):
+        ws = self._spreadsheet.add_worksheet(title=title, rows=rows, cols=cols, index=index)
+        with self._lock:
+            if self._tabs is not None:
+                self._tabs[ws.title] = ws
+        return ws
+
+    def del_worksheet(self, worksheet):
+        result = self._spreadsheet.del_worksheet(worksheet)
+        with self._lock:
+            if self._tabs is not None:
+                self._tabs.pop(worksheet.title, None)
+        return result
+
+    def batch_update(self, body: dict):
+        response = self._spreadsheet.batch_update(body)
+        with self._lock:
+            if self._tabs is not None:
+                self._apply(body.get("requests", []), response.get("replies", []))
+        return response
+
+    def _apply(self, requests: list[dict], replies: list[dict]) -> None:
+        """Mirror the tab changes of a batch_update into the map."""
+        by_id = {ws.id: ws for ws in self._tabs.values()}
+        for request, reply in zip(requests, replies):
+            if "addSheet" in request:
+                properties = {
+                    **request["addSheet"].get("properties", {}),
+                    **(reply.get("addSheet") or {}).get("properties", {}),
+                }
+                ws = self._worksheet_from(properties)
+                if ws is None:
+                    # Not a gspread spreadsheet: fetch the metadata again on next use
+                    self._tabs = None
+                    return
+                self._tabs[ws.title] = ws
+            elif "deleteSheet" in request:
+                ws = by_id.get(request["deleteSheet"].get("sheetId"))
+                if ws is not None:
+                    self._tabs.pop(ws.title, None)
+            elif "updateSheetProperties" in request:
+                properties = request["updateSheetProperties"].get("properties", {})
+                ws = by_id.get(properties.get("sheetId"))
+                target = _unwrapped(ws)
+                if isinstance(target, gspread.Worksheet):
+                    target._properties.setdefault("gridProperties", {}).update(
+                        properties.get("gridProperties", {})
+                    )
+
+    def _worksheet_from(self, properties: dict):
+        spreadsheet = self.unwrapped
+        if not isinstance(spreadsheet, gspread.Spreadsheet):
+            return None
+        ws = gspread.Worksheet(spreadsheet, properties, spreadsheet.id, spreadsheet.client)
+        wrap = getattr(self._spreadsheet, "wrap", None)
+        return wrap(ws) if wrap else ws
+
+
+class SheetRegistry:
+    """
+    Client wrapper that opens each spreadsheet once per process.
+
+    `open_by_key()` returns the same `RegisteredSpreadsheet` for a key every
+    time, so pipeline code can keep calling
+    `client.open_by_key(key).worksheet(title)` without a metadata round trip
+    per call. Everything else (e.g. `http_client`) passes through.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+        self._spreadsheets: dict[str, RegisteredSpreadsheet] = {}
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+    def __repr__(self) -> str:
+        return f"SheetRegistry({self._client!r})"
+
+    def _open(self, key: str) -> RegisteredSpreadsheet:
+        """
+        Open a spreadsheet with a single metadata request.
+
+        gspread's `open_by_key` fetches the metadata but keeps only the
+        spreadsheet properties, so listing the tabs afterwards would fetch it
+        again. For gspread clients the handle is built without that fetch and
+        the tab map comes from one explicit `fetch_sheet_metadata` (through
+        the wrapping proxy, so it is still scheduled as a read). This builds
+        on gspread 6 internals (`_properties`, the Worksheet signature), hence
+        the `gspread>=6,<7` pin in requirements.txt.
+        """
+        client = _unwrapped(self._client)
+        if not isinstance(client, gspread.Client):
+            return RegisteredSpreadsheet(self._client.open_by_key(key))
+
+        spreadsheet = gspread.Spreadsheet.__new__(gspread.Spreadsheet)
+        spreadsheet.client = client.http_client
+        spreadsheet._properties = {"id": key}
+        wrap = getattr(self._client, "wrap", None)
+        handle = wrap(spreadsheet) if wrap else spreadsheet
+        try:
+            metadata = handle.fetch_sheet_metadata()
+        except APIError as ex:
+            # Same errors as gspread's open_by_key
+            if ex.response.status_code == HTTPStatus.NOT_FOUND:
+                raise SpreadsheetNotFound(ex.response) from ex
+            if ex.response.status_code == HTTPStatus.FORBIDDEN:
+                raise PermissionError from ex
+            raise
+        spreadsheet._properties.update(metadata["properties"])
+        return RegisteredSpreadsheet(handle, metadata)
+
+    def open_by_key(self, key: str) -> RegisteredSpreadsheet:
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(key)
+        if spreadsheet is None:
+            spreadsheet = self._open(key)
+            with self._lock:
+                spreadsheet = self._spreadsheets.setdefault(key, spreadsheet)
+        return spreadsheet
+
+    def invalidate(self) -> None:
+        """
+        Re-read the tab maps on next use, e.g. after the spreadsheets changed
+        outside this process (a tab renamed or deleted by hand).
+        """
+        with self._lock:
+            spreadsheets = list(self._spreadsheets.values())
+        for spreadsheet in spreadsheets:
+            spreadsheet.invalidate()
@@ -0,0 +1,264 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import requests
+from gspread.exceptions import APIError
+
+# Per-minute quotas of the Sheets API for a single user (the service account)
+DEFAULT_READS_PER_MINUTE = 60
+DEFAULT_WRITES_PER_MINUTE = 60
+
+# gspread methods by the quota they consume
+READ_METHODS = {
+    "open_by_key",
+    "worksheet",
+    "worksheets",
+    "fetch_sheet_metadata",
+    "get",
+    "get_values",
+    "get_all_values",
+    "get_all_records",
+    "batch_get",
+    "values_get",
+    "values_batch_get",
+}
+WRITE_METHODS = {
+    "add_worksheet",
+    "del_worksheet",
+    "append_row",
+    "append_rows",
+    "update",
+    "batch_update",
+    "clear",
+    "batch_clear",
+    "values_update",
+    "values_append",
+    "values_clear",
+    "values_batch_update",
+    "values_batch_clear",
+}
+
+
+def is_retryable(error: Exception, kind: str) -> bool:
+    """
+    429 is always safe to retry (the request was rejected). 5xx and dropped
+    connections are only retried for reads, since a write may have landed.
+    """
+    if isinstance(error, APIError):
+        return error.code == 429 or (kind != "write" and error.code >= 500)
+    return kind != "write" and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class _Budget:
+    """Sliding one-minute window of request timestamps for one quota."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._sent: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request fits in the window; return the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= 60:
+                    self._sent.popleft()
+                if len(self._sent) < self.per_minute:
+                    self._sent.append(now)
+                    return waited
+                delay = 60 - (now - self._sent[0])
+            time.sleep(delay)
+            waited += delay
+
+
+class SheetsScheduler:
+    """
+    Central gate for every Google Sheets call.
+
+    Tracks the read and write quotas separately and paces requests to stay
+    under them, retries 429/5xx with jittered (full-jitter) exponential
+    backoff, and
+    coalesces identical reads issued within `coalesce_window` seconds (any
+    write invalidates them). `stats()` reports how long the run spent waiting.
+    """
+
+    def __init__(
+        self,
+        reads_per_minute: int = DEFAULT_READS_PER_MINUTE,
+        writes_per_minute: int = DEFAULT_WRITES_PER_MINUTE,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 64.0,
+        coalesce_window: float = 5.0,
+    ):
+        self._budgets = {
+            "read": _Budget(reads_per_minute),
+            "write": _Budget(writes_per_minute),
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.coalesce_window = coalesce_window
+
+        self._lock = threading.Lock()
+        self._reads: dict[tuple, tuple[float, Future]] = {}
+        self._stats = {
+            "read_calls": 0,
+            "write_calls": 0,
+            "drive_calls": 0,
+            "coalesced_reads": 0,
+            "retries": 0,
+            "quota_wait_seconds": 0.0,
+            "backoff_wait_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "SheetsScheduler":
+        """Quotas from SHEETS_READS_PER_MINUTE / SHEETS_WRITES_PER_MINUTE."""
+        return cls(
+            reads_per_minute=int(os.getenv("SHEETS_READS_PER_MINUTE", DEFAULT_READS_PER_MINUTE)),
+            writes_per_minute=int(os.getenv("SHEETS_WRITES_PER_MINUTE", DEFAULT_WRITES_PER_MINUTE)),
+        )
+
+    def _add(self, name: str, value: float) -> None:
+        with self._lock:
+            self._stats[name] += value
+
+    def _call(self, kind: str, fn, *args, **kwargs):
+        """Run one request under the `kind` budget, retrying transient errors."""
+        for attempt in range(self.max_retries + 1):
+            if kind in self._budgets:
+                self._add("quota_wait_seconds", self._budgets[kind].acquire())
+            self._add(f"{kind}_calls", 1)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e, kind):
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+                self._add("retries", 1)
+                self._add("backoff_wait_seconds", delay)
+                time.sleep(delay)
+
+    def read(self, key: tuple | None, fn, *args, **kwargs):
+        """Run a read; concurrent or recent reads with the same `key` share one request."""
+        if key is None or not self.coalesce_window:
+            return self._call("read", fn, *args, **kwargs)
+
+        with self._lock:
+            cached = self._reads.get(key)
+            if cached and time.monotonic() - cached[0] < self.coalesce_window:
+                self._stats["coalesced_reads"] += 1
+                future = cached[1]
+                owner = False
+            else:
+                now = time.monotonic()
+                # Drop expired reads so a long-lived (serve) process doesn't accumulate them
+                for stale in [k for k, (at, _) in self._reads.items() if now - at >= self.coalesce_window]:
+                    del self._reads[stale]
+                future = Future()
+                self._reads[key] = (now, future)
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._call("read", fn, *args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                if self._reads.get(key, (None, None))[1] is future:
+                    del self._reads[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def write(self, fn, *args, **kwargs):
+        """Run a write; invalidates every coalesced read."""
+        with self._lock:
+            self._reads.clear()
+        return self._call("write", fn, *args, **kwargs)
+
+    def unmetered(self, fn, *args, **kwargs):
+        """Run a non-Sheets request (e.g. Drive metadata) with retries only."""
+        return self._call("drive", fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["quota_wait_seconds"] = round(stats["quota_wait_seconds"], 3)
+        stats["backoff_wait_seconds"] = round(stats["backoff_wait_seconds"], 3)
+        return stats
+
+
+class ScheduledProxy:
+    """
+    Wrap a gspread client, spreadsheet or worksheet so every API method goes
+    through a SheetsScheduler. Spreadsheets and worksheets returned by those
+    methods are wrapped too; other attributes pass straight through.
+    """
+
+    def __init__(self, target, scheduler: SheetsScheduler, scope: tuple = ()):
+        self._target = target
+        self._scheduler = scheduler
+        self._scope = scope
+
+    @property
+    def unwrapped(self):
+        return self._target
+
+    def wrap(self, value):
+        """Wrap spreadsheets/worksheets (or lists of them) in a proxy on the same scheduler."""
+        if isinstance(value, list) and value and hasattr(value[0], "get_all_values"):
+            return [self.wrap(item) for item in value]
+        if hasattr(value, "get_all_values") or hasattr(value, "values_batch_update"):
+            spreadsheet_id = getattr(value, "spreadsheet_id", None) or getattr(
+                getattr(value, "spreadsheet", None), "id", None
+            )
+            scope = (spreadsheet_id, getattr(value, "id", None))
+            return ScheduledProxy(value, self._scheduler, scope)
+        return value
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+
+        if name == "http_client":
+            return _UnmeteredProxy(attr, self._scheduler)
+        if not callable(attr) or name not in READ_METHODS | WRITE_METHODS:
+            return attr
+
+        scheduler = self._scheduler
+
+        def scheduled(*args, **kwargs):
+            if name in WRITE_METHODS:
+                result = scheduler.write(attr, *args, **kwargs)
+            else:
+                key = (self._scope, name, repr(args), repr(sorted(kwargs.items())))
+                result = scheduler.read(key, attr, *args, **kwargs)
+            return self.wrap(result)
+
+        return scheduled
+
+    def __repr__(self) -> str:
+        return f"ScheduledProxy({self._target!r})"
+
+
+class _UnmeteredProxy:
+    """Route `http_client.request` (Drive metadata) through the scheduler's retries."""
+
+    def __init__(self, target, scheduler: SheetsScheduler):
+        self._target = target
+        self._scheduler = scheduler
+
+    def request(self, *args, **kwargs):
+        return self._scheduler.unmetered(self._target.request, *args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._target, name)
@@ -1,29 +1,124 @@
+import asyncio
 import os
+from dataclasses import dataclass
+from typing import Iterable
+
 from dotenv import load_dotenv, find_dotenv
-from telegram import Bot
 from telegram.error import TelegramError
+from telegram.ext import AIORateLimiter, ExtBot
+from telegram.request import HTTPXRequest
 
 # Load .env automatically (works from subfolders)
 load_dotenv(find_dotenv())
 
+# Concurrent HTTPS connections kept open to api.telegram.org
+DEFAULT_POOL_SIZE = 16
+
+
+@dataclass
+class TelegramResult:
+    """Outcome of one message: `error` is None when it was delivered."""
+
+    chat_id: str
+    text: str
+    message_id: int | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TelegramSender:
+    """
+    Process-wide Telegram sender for python-telegram-bot v21.
+
+    Holds a single initialized bot with a sized HTTPX connection pool and
+    python-telegram-bot's AIORateLimiter, which keeps sends within Telegram's
+    global and per-chat limits and retries on RetryAfter.
+    """
+
+    def __init__(self, token: str | None = None, pool_size: int = DEFAULT_POOL_SIZE):
+        self.token = token or os.getenv("BOT_TOKEN")
+        if not self.token:
+            raise ValueError("BOT_TOKEN not found in environment.")
+
+        self.pool_size = pool_size
+        self.bot = ExtBot(
+            token=self.token,
+            request=HTTPXRequest(connection_pool_size=pool_size),
+            rate_limiter=AIORateLimiter(max_retries=3),
+        )
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+
+    async def initialize(self) -> None:
+        """Initialize the bot once (opens the pool and calls getMe)."""
+        async with self._init_lock:
+            if not self._initialized:
+                await self.bot.initialize()
+                self._initialized = True
+
+    async def shutdown(self) -> None:
+        """Close the connection pool."""
+        if self._initialized:
+            await self.bot.shutdown()
+            self._initialized = False
+
+    async def send(self, chat_id: str, text: str) -> TelegramResult:
+        """Send one message; errors are returned in the result instead of raised."""
+        await self.initialize()
+        try:
+            message = await self.bot.send_message(chat_id=chat_id, text=text)
+        except TelegramError as e:
+            return TelegramResult(chat_id, text, error=str(e))
+        return TelegramResult(chat_id, text, message_id=message.message_id)
+
+    async def send_many(self, messages: Iterable[tuple[str, str]]) -> list[TelegramResult]:
+        """Send many (chat_id, text) pairs concurrently, results in input order."""
+        await self.initialize()
+        return list(
+            await asyncio.gather(*(self.send(chat_id, text) for chat_id, text in messages))
+        )
+
+
+_shared_sender: TelegramSender | None = None
+
+
+def get_telegram_sender() -> TelegramSender:
+    """Return the process-wide TelegramSender, creating it on first use."""
+    global _shared_sender
+    if _shared_sender is None:
+        _shared_sender = TelegramSender()
+    return _shared_sender
+
+
+async def shutdown_telegram_sender() -> None:
+    """Shut down the process-wide TelegramSender if one was created."""
+    global _shared_sender
+    if _shared_sender is not None:
+        await _shared_sender.shutdown()
+        _shared_sender = None
+
+
 class TelegramBot:
-    """Async Telegram bot helper for python-telegram-bot v20+."""
+    """Async Telegram bot helper for a single chat, backed by the shared TelegramSender."""
 
     def __init__(self, chat_id: str):
-        self.token = os.getenv("BOT_TOKEN")
         self.chat_id = chat_id
 
-        if not self.token:
-            raise ValueError("BOT_TOKEN not found in environment.")
         if not self.chat_id:
             raise ValueError("chat_id must be provided.")
 
-        self.bot = Bot(token=self.token)
+        self.sender = get_telegram_sender()
+        self.token = self.sender.token
+        self.bot = self.sender.bot
 
-    async def send(self, text: str):
+    async def send(self, text: str) -> TelegramResult:
         """Send a text message asynchronously."""
-        try:
-            await self.bot.send_message(chat_id=self.chat_id, text=text)
+        result = await self.sender.send(self.chat_id, text)
+        if result.ok:
             print(f"✅ Sent to Telegram: {text}")
-        except TelegramError as e:
-            print(f"❌ Failed to send message: {e}")
+        else:
+            print(f"❌ Failed to send message: {result.error}")
+        return result
@@ -1,8 +1,15 @@
+import asyncio
 import os
-import re
+import random
+from dataclasses import dataclass
+
+import httpx
 import requests
 from dotenv import load_dotenv, find_dotenv
 
+from utils.metrics import get_metrics
+from utils.number import normalize_whatsapp_number
+
 # Load .env
 load_dotenv(find_dotenv())
 
@@ -16,6 +23,9 @@ BAILEYS_ERROR_MAP = {
     500: "Internal server error (Baileys crash)",
 }
 
+# Transient statuses worth retrying: rate limited / session busy
+RETRYABLE_STATUS_CODES = {409, 429}
+
 class WhatsAppSendError(Exception):
     """Base exception for WhatsApp send failures."""
     pass
@@ -38,6 +48,36 @@ class WhatsAppNetworkError(WhatsAppSendError):
 
 
 
+def get_status_url(base_url: str) -> str:
+    """Derive the /status endpoint from the configured send-message URL."""
+    return base_url.replace("/send-message", "/status") if "/send-message" in base_url else f"{base_url}/status"
+
+
+def get_bulk_url(base_url: str) -> str:
+    """Derive the /send-bulk endpoint from the configured send-message URL."""
+    if "/send-message" in base_url:
+        return base_url.replace("/send-message", "/send-bulk")
+    return f"{base_url}/send-bulk"
+
+
+@dataclass
+class WhatsAppSendResult:
+    """Outcome of one (number, message) job of `send_many`; `error` is None on success."""
+
+    number: str
+    response: dict | None = None
+    error: str | None = None
+    status_code: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @classmethod
+    def from_exception(cls, number: str, e: Exception) -> "WhatsAppSendResult":
+        return cls(number, error=str(e), status_code=getattr(e, "status_code", None))
+
+
 class WhatsAppBot:
     """WhatsApp REST API Client with number validation."""
 
@@ -51,41 +91,20 @@ class WhatsAppBot:
         if not self.token:
             raise ValueError("WHATSAPP_BOT_TOKEN not found in environment.")
 
-        # Prepare headers once
+        # Prepare headers once; the session keeps the connection alive between sends
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     def normalize_number(self, number: str) -> str:
         """
         valid for indonesian number only
         Normalize phone number to format: 628xxxxxxxxx
         """
-
-        cleaned = re.sub(r"[^0-9+]", "", number)
-
-        if re.search(r"[A-Za-z]", cleaned):
-            raise ValueError("Phone number must not contain letters.")
-
-        cleaned = cleaned.lstrip("+")
-
-        if cleaned.startswith("0"):
-            cleaned = "62" + cleaned[1:]
-        elif cleaned.startswith("8"):
-            cleaned = "62" + cleaned
-        elif cleaned.startswith("62"):
-            pass
-        else:
-            raise ValueError(f"Invalid phone format: {number}")
-
-        if not cleaned.isdigit():
-            raise ValueError(f"Phone number contains invalid characters: {number}")
-
-        if len(cleaned) < 10:
-            raise ValueError(f"Phone number too short: {number}")
-
-        return cleaned
+        return normalize_whatsapp_number(number)
 
     def send(self, number: str, message: str) -> dict:
         """Send a WhatsApp message via Baileys API.
@@ -109,10 +128,9 @@ class WhatsAppBot:
 
         # 2️⃣ HTTP request
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 json=payload,
-                headers=self.headers,
                 timeout=10
             )
         except requests.exceptions.RequestException as e:
@@ -133,6 +151,16 @@ class WhatsAppBot:
         # 4️⃣ Success
         return response.json()
 
+    def send_many(self, jobs: list[tuple[str, str]]) -> list[WhatsAppSendResult]:
+        """Send (number, message) jobs one after another over the kept-alive session."""
+        results = []
+        for number, message in jobs:
+            try:
+                results.append(WhatsAppSendResult(number, response=self.send(number, message)))
+            except WhatsAppSendError as e:
+                results.append(WhatsAppSendResult.from_exception(number, e))
+        return results
+
     def get_status(self) -> dict:
         """
         Check the current connection status of the WhatsApp bot.
@@ -140,11 +168,10 @@ class WhatsAppBot:
         """
         try:
             # Menggunakan endpoint /status untuk mengecek session
-            status_url = self.base_url.replace("/send-message", "/status") if "/send-message" in self.base_url else f"{self.base_url}/status"
+            status_url = get_status_url(self.base_url)
             
-            response = requests.get(
+            response = self.session.get(
                 status_url,
-                headers=self.headers,
                 timeout=10
             )
         except requests.exceptions.RequestException as e:
@@ -154,4 +181,222 @@ class WhatsAppBot:
             error_message = BAILEYS_ERROR_MAP.get(response.status_code, response.text)
             raise WhatsAppAPIError(status_code=response.status_code, message=error_message)
 
-        return response.json()
\ No newline at end of file
+        return response.json()
+
+
+class AsyncWhatsAppBot:
+    """
+    Asyncio WhatsApp REST API client for the Baileys API.
+
+    Keeps one keep-alive connection pool for all requests, bounds the number
+    of in-flight requests and retries 429/409 responses with exponential
+    backoff. Raises the same exceptions as WhatsAppBot.
+
+    `send_many` sends a list of jobs in one go: in chunks of `bulk_size`
+    through /send-bulk when /status advertises "send-bulk" in its
+    `features` (or `bulk=True`), otherwise as pipelined single sends over
+    the pool.
+
+    base_url/token default to WHATSAPP_URL/WHATSAPP_BOT_TOKEN, so the client
+    can be pointed at a local stub server.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        token: str | None = None,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        timeout: float = 10,
+        bulk_size: int = 50,
+        bulk: bool | None = None,
+    ):
+        self.base_url = base_url or os.getenv("WHATSAPP_URL")
+        self.token = token or os.getenv("WHATSAPP_BOT_TOKEN")
+
+        if not self.base_url:
+            raise ValueError("WHATSAPP_URL not found in environment.")
+
+        if not self.token:
+            raise ValueError("WHATSAPP_BOT_TOKEN not found in environment.")
+
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bulk_size = bulk_size
+        # Whether to use /send-bulk; None asks /status on the first send_many
+        self._bulk = bulk
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            },
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+
+    async def __aenter__(self) -> "AsyncWhatsAppBot":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        await self._client.aclose()
+
+    def normalize_number(self, number: str) -> str:
+        return normalize_whatsapp_number(number)
+
+    async def _backoff(self, attempt: int, retry_after: str | float = "") -> None:
+        """Sleep before retry `attempt`: the server's Retry-After, else exponential, plus jitter."""
+        retry_after = str(retry_after or "")
+        delay = (
+            float(retry_after)
+            if retry_after.replace(".", "", 1).isdigit()
+            else self.backoff * 2**attempt
+        )
+        delay += random.uniform(0, self.backoff)
+        metrics = get_metrics()
+        metrics.count("http_retries", api="whatsapp")
+        metrics.count("backoff_wait_seconds", delay, api="whatsapp")
+        await asyncio.sleep(delay)
+
+    async def _request(self, method: str, url: str, **kwargs) -> dict:
+        """Send a request, retrying 429/409 with backoff, and return the JSON body."""
+        metrics = get_metrics()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                metrics.count("http_errors", api="whatsapp")
+                raise WhatsAppNetworkError(f"Network error: {e}")
+
+            metrics.count("http_requests", api="whatsapp", status=response.status_code)
+            metrics.count("http_bytes_sent", len(response.request.content), api="whatsapp")
+            metrics.count("http_bytes_received", len(response.content), api="whatsapp")
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                await self._backoff(attempt, response.headers.get("Retry-After", ""))
+                continue
+
+            raise WhatsAppAPIError(
+                status_code=response.status_code,
+                message=BAILEYS_ERROR_MAP.get(response.status_code, response.text),
+            )
+
+    async def send(self, number: str, message: str) -> dict:
+        """Send a WhatsApp message via Baileys API.
+
+        :raises WhatsAppValidationError
+        :raises WhatsAppNetworkError
+        :raises WhatsAppAPIError
+        :return: response JSON
+        """
+        try:
+            formatted = self.normalize_number(number)
+        except ValueError as e:
+            raise WhatsAppValidationError(str(e))
+
+        return await self._request(
+            "POST", self.base_url, json={"number": formatted, "message": message}
+        )
+
+    async def get_status(self) -> dict:
+        """Check the current connection status of the WhatsApp bot (/status)."""
+        return await self._request("GET", get_status_url(self.base_url))
+
+    async def supports_bulk(self) -> bool:
+        """Whether the server advertises /send-bulk (asked once, then cached)."""
+        if self._bulk is None:
+            try:
+                status = await self.get_status()
+            except WhatsAppSendError:
+                return False
+            self._bulk = "send-bulk" in (status.get("features") or [])
+            if status.get("max_bulk"):
+                self.bulk_size = min(self.bulk_size, int(status["max_bulk"]))
+        return self._bulk
+
+    async def _send_result(self, number: str, message: str) -> WhatsAppSendResult:
+        try:
+            return WhatsAppSendResult(number, response=await self.send(number, message))
+        except WhatsAppSendError as e:
+            return WhatsAppSendResult.from_exception(number, e)
+
+    async def _send_bulk(
+        self, jobs: list[tuple[str, str]], results: list, indices: list[int]
+    ) -> None:
+        """Send one chunk through /send-bulk, retrying per-message 429/409 results."""
+        pending = indices
+        for attempt in range(self.max_retries + 1):
+            payload = [
+                {"number": self.normalize_number(jobs[i][0]), "message": jobs[i][1]}
+                for i in pending
+            ]
+            try:
+                body = await self._request(
+                    "POST", get_bulk_url(self.base_url), json={"messages": payload}
+                )
+                items = body.get("results") or []
+                if len(items) != len(pending):
+                    raise WhatsAppAPIError(
+                        200, f"bulk returned {len(items)} results for {len(pending)} messages"
+                    )
+            except WhatsAppSendError as e:
+                for i in pending:
+                    results[i] = WhatsAppSendResult.from_exception(jobs[i][0], e)
+                return
+
+            retry, retry_after = [], 0.0
+            for i, item in zip(pending, items):
+                code = int(item.get("code") or 200)
+                if code == 200:
+                    results[i] = WhatsAppSendResult(jobs[i][0], response=item)
+                    continue
+                error = WhatsAppAPIError(code, BAILEYS_ERROR_MAP.get(code, item.get("error", "")))
+                results[i] = WhatsAppSendResult(
+                    jobs[i][0], response=item, error=str(error), status_code=code
+                )
+                if code in RETRYABLE_STATUS_CODES:
+                    retry.append(i)
+                    retry_after = max(retry_after, float(item.get("retry_after") or 0))
+
+            if not retry or attempt == self.max_retries:
+                return
+            await self._backoff(attempt, retry_after or "")
+            pending = retry
+
+    async def send_many(self, jobs: list[tuple[str, str]]) -> list[WhatsAppSendResult]:
+        """
+        Send (number, message) jobs and return one result per job, in order.
+
+        Never raises for a failed job: invalid numbers, API and network
+        errors end up in the job's result.
+        """
+        results: list[WhatsAppSendResult | None] = [None] * len(jobs)
+        valid = []
+        for i, (number, _) in enumerate(jobs):
+            try:
+                self.normalize_number(number)
+                valid.append(i)
+            except ValueError as e:
+                results[i] = WhatsAppSendResult(number, error=str(WhatsAppValidationError(str(e))))
+
+        if len(valid) > 1 and await self.supports_bulk():
+            chunks = [valid[i : i + self.bulk_size] for i in range(0, len(valid), self.bulk_size)]
+            await asyncio.gather(*(self._send_bulk(jobs, results, chunk) for chunk in chunks))
+        else:
+            # Pipelined: every job is in flight at once, bounded by the pool's semaphore
+            sent = await asyncio.gather(*(self._send_result(*jobs[i]) for i in valid))
+            for i, result in zip(valid, sent):
+                results[i] = result
+        return results